@@ -0,0 +1,77 @@
+"""Benchmark group commit: jumlah COMMIT dan throughput untuk beberapa ukuran batch
+
+Jalankan: python bench_group_commit.py [jumlah_operasi]
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+from visual import GroupCommitQueue
+
+
+def jalankan(db_path, jumlah, max_batch, synchronous):
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE IF NOT EXISTS bench (id INTEGER PRIMARY KEY, nilai INTEGER)")
+    conn.commit()
+
+    commits = []
+    conn.set_trace_callback(lambda sql: commits.append(sql) if sql.strip().upper() == 'COMMIT' else None)
+
+    # Timer ditahan (tidak pernah dipanggil), jadi flush hanya terjadi saat batch penuh
+    queue = GroupCommitQueue(conn, schedule=lambda ms, func: None, max_batch=max_batch,
+                             max_delay_ms=1000, synchronous=synchronous)
+    hasil = []
+    start = time.perf_counter()
+    for i in range(jumlah):
+        queue.submit(lambda i=i: conn.execute("INSERT INTO bench (nilai) VALUES (?)", (i,)),
+                     lambda ok, value: hasil.append(ok))
+    queue.flush()
+    durasi = time.perf_counter() - start
+
+    conn.set_trace_callback(None)
+    conn.close()
+    assert len(hasil) == jumlah and all(hasil)
+    return len(commits), durasi
+
+
+def cek_atomik(db_path):
+    """Koneksi lain tidak boleh melihat operasi batch sebelum seluruh batch di-commit"""
+    conn = sqlite3.connect(db_path)
+    other = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE IF NOT EXISTS atomik (nilai INTEGER)")
+    conn.commit()
+
+    terlihat = []
+
+    def insert(i):
+        conn.execute("INSERT INTO atomik VALUES (?)", (i,))
+        terlihat.append(other.execute("SELECT COUNT(*) FROM atomik").fetchone()[0])
+
+    queue = GroupCommitQueue(conn, schedule=lambda ms, func: None, max_batch=100, max_delay_ms=1000)
+    for i in range(3):
+        queue.submit(lambda i=i: insert(i))
+    queue.flush()
+    total = other.execute("SELECT COUNT(*) FROM atomik").fetchone()[0]
+    conn.close()
+    other.close()
+    return terlihat, total
+
+
+def main():
+    jumlah = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    with tempfile.TemporaryDirectory(dir='.') as tmp:
+        terlihat, total = cek_atomik(os.path.join(tmp, 'atomik.db'))
+        print(f"Terlihat koneksi lain selama batch: {terlihat}, setelah commit: {total}")
+
+        print(f"{'synchronous':<12}{'batch':>6}{'commit':>8}{'op/s':>10}")
+        for synchronous in ('FULL', 'NORMAL'):
+            for max_batch in (1, 8, 64):
+                db_path = os.path.join(tmp, f"bench_{synchronous}_{max_batch}.db")
+                commits, durasi = jalankan(db_path, jumlah, max_batch, synchronous)
+                print(f"{synchronous:<12}{max_batch:>6}{commits:>8}{jumlah / durasi:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
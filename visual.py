@@ -1,12 +1,428 @@
 
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog, simpledialog
+import argparse
+import csv
+import getpass
+import multiprocessing
+import os
+import re
 import sqlite3
-from datetime import datetime
+import sys
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from urllib.request import pathname2url
+
+# Lokasi database default; bisa diganti lewat argumen --db atau env KRS_DB_PATH
+DB_PATH = 'farhan_krs.db'
+
+# Mode in-memory (--memory / KRS_DB_MEMORY=1): database dimuat ke :memory: saat start
+# dan dipersist ke disk setiap PERSIST_INTERVAL_MS serta saat aplikasi ditutup.
+# Model durabilitas berbasis snapshot (bukan write-ahead log): setiap persist menyalin
+# seluruh database ke file sementara (bertahap, BACKUP_PAGES_PER_STEP halaman per langkah
+# di thread terpisah) lalu rename atomik. Jendela durabilitas: jika proses crash/di-kill,
+# perubahan sejak persist terakhir yang selesai hilang (sekitar PERSIST_INTERVAL_MS ditambah
+# lama satu salinan). Penutupan normal lewat tombol close tidak kehilangan data.
+PERSIST_INTERVAL_MS = 5000
+
+# Backup online: folder tujuan, jadwal, jumlah snapshot yang disimpan, dan halaman per langkah
+BACKUP_DIR = 'backup_krs'
+BACKUP_INTERVAL_MS = 30 * 60 * 1000
+BACKUP_RETENSI = 7
+BACKUP_PAGES_PER_STEP = 64
+
+# Interval polling change feed antar instance (ms) dan jumlah baris log yang disimpan
+POLL_INTERVAL_MS = 1000
+CHANGE_LOG_RETENSI = 10000
+CHANGE_LOG_PRUNE_INTERVAL_MS = 60 * 1000
+
+# Group commit: operasi tulis dikumpulkan maksimal N operasi / N ms per transaksi.
+# GROUP_COMMIT_SYNCHRONOUS: 'FULL' = fsync tiap commit (paling aman), 'NORMAL' = lebih cepat
+GROUP_COMMIT_MAX_BATCH = 64
+GROUP_COMMIT_MAX_DELAY_MS = 20
+GROUP_COMMIT_SYNCHRONOUS = 'FULL'
+
+# Snapshot riwayat KRS dibuat setiap N event; snapshot lama dipadatkan (compaction)
+SNAPSHOT_SETIAP = 500
+SNAPSHOT_RETENSI = 10
+SNAPSHOT_HARIAN_HARI = 30
+
+# Pilihan status KRS yang bisa di-set dari tab laporan
+STATUS_KRS = ('Aktif', 'Lulus', 'Tidak Lulus', 'Mengulang')
+
+# Jumlah mahasiswa per halaman roster (keyset pagination)
+ROSTER_PAGE_SIZE = 40
+
+
+class QueryCache:
+    """LRU cache hasil query, di-invalidate otomatis lewat token perubahan database"""
+
+    def __init__(self, conn, max_entries=128, max_bytes=4 * 1024 * 1024):
+        self.conn = conn
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def token(self):
+        """Token perubahan: data_version (tulis dari koneksi/proses lain) + total_changes (tulis lokal)"""
+        data_version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        return (data_version, self.conn.total_changes)
+
+    def query(self, sql, params=()):
+        """Jalankan query SELECT, ambil dari cache jika database belum berubah"""
+        key = (sql, tuple(params))
+        token = self.token()
+        entry = self.entries.get(key)
+        if entry is not None and entry[0] == token:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        rows = self.conn.execute(sql, params).fetchall()
+        if entry is not None:
+            self.total_bytes -= entry[2]
+            del self.entries[key]
+
+        size = self.estimate_size(key, rows)
+        if size <= self.max_bytes:
+            self.entries[key] = (token, rows, size)
+            self.total_bytes += size
+            while len(self.entries) > self.max_entries or self.total_bytes > self.max_bytes:
+                _, (_, _, old_size) = self.entries.popitem(last=False)
+                self.total_bytes -= old_size
+        return rows
+
+    def clear(self):
+        """Kosongkan semua entry cache"""
+        self.entries.clear()
+        self.total_bytes = 0
+
+    @staticmethod
+    def estimate_size(key, rows):
+        """Perkiraan memori (byte) yang dipakai satu entry"""
+        size = sys.getsizeof(key[0]) + sys.getsizeof(rows)
+        for value in key[1]:
+            size += sys.getsizeof(value)
+        for row in rows:
+            size += sys.getsizeof(row)
+            for value in row:
+                size += sys.getsizeof(value)
+        return size
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def info_text(self):
+        """Ringkasan hit rate dan memori untuk ditampilkan di GUI"""
+        return (f"Cache: {self.hit_rate():.0%} hit ({self.hits}/{self.hits + self.misses}) | "
+                f"{len(self.entries)} entry, {self.total_bytes / 1024:.1f} KB")
+
+
+class BatasSKSError(Exception):
+    """Total SKS aktif akan melebihi max_sks mahasiswa"""
+
+
+class KRSSudahAdaError(Exception):
+    """Mata kuliah sudah aktif atau sudah lulus, tidak bisa diambil lagi"""
+
+
+class GroupCommitQueue:
+    """Antrian tulis dengan group commit: banyak operasi digabung dalam satu transaksi/fsync
+    
+    Setiap operasi dijalankan di SAVEPOINT sendiri, sehingga kegagalan satu operasi
+    tidak membatalkan operasi lain di batch yang sama. Callback tiap pemanggil
+    menerima (ok, hasil) setelah batch di-commit.
+    """
+
+    def __init__(self, conn, schedule=None, max_batch=GROUP_COMMIT_MAX_BATCH,
+                 max_delay_ms=GROUP_COMMIT_MAX_DELAY_MS, synchronous=GROUP_COMMIT_SYNCHRONOUS):
+        self.conn = conn
+        self.schedule = schedule
+        self.max_batch = max_batch
+        self.max_delay_ms = max_delay_ms
+        self.pending = []
+        self.flush_scheduled = False
+        self.paused = False
+        self.batches = 0
+        self.operations = 0
+        self.commit_seconds = 0.0
+        self.conn.execute(f"PRAGMA synchronous={synchronous}")
+
+    def submit(self, operation, callback=None):
+        """Masukkan operasi ke antrian; commit saat batch penuh atau jendela waktu habis"""
+        self.pending.append((operation, callback))
+        if len(self.pending) >= self.max_batch or self.max_delay_ms <= 0 or self.schedule is None:
+            self.flush()
+        elif not self.flush_scheduled:
+            self.flush_scheduled = True
+            self.schedule(self.max_delay_ms, self.flush)
+
+    def flush(self):
+        """Jalankan semua operasi yang menunggu dalam satu transaksi, lalu panggil callback"""
+        if self.paused:
+            # Ditahan (mis. selama persist); pemanggil resume wajib memanggil flush()
+            return
+        self.flush_scheduled = False
+        batch, self.pending = self.pending, []
+        if not batch:
+            return
+        
+        # Satu transaksi untuk seluruh batch; tanpa BEGIN, SAVEPOINT pertama membuka
+        # transaksi sendiri dan RELEASE-nya langsung commit (satu fsync per operasi)
+        if not self.conn.in_transaction:
+            self.conn.execute("BEGIN")
+        
+        results = []
+        for operation, callback in batch:
+            self.conn.execute("SAVEPOINT group_op")
+            try:
+                value = operation()
+                self.conn.execute("RELEASE group_op")
+                results.append((callback, True, value))
+            except Exception as e:
+                self.conn.execute("ROLLBACK TO group_op")
+                self.conn.execute("RELEASE group_op")
+                results.append((callback, False, e))
+        
+        start = time.perf_counter()
+        try:
+            self.conn.commit()
+        except Exception as e:
+            self.conn.rollback()
+            results = [(callback, False, e) for callback, _, _ in results]
+        self.commit_seconds += time.perf_counter() - start
+        self.batches += 1
+        self.operations += len(batch)
+        
+        for callback, ok, value in results:
+            if callback:
+                callback(ok, value)
+
+    def info_text(self):
+        """Ringkasan ukuran batch rata-rata dan waktu commit"""
+        if not self.batches:
+            return "Group commit: belum ada batch"
+        return (f"Group commit: {self.operations} op / {self.batches} batch | "
+                f"{self.commit_seconds / self.batches * 1000:.1f} ms/commit")
+
+
+class EligibilityEngine:
+    """Indeks in-memory mata kuliah untuk daftar "tersedia" berbasis bitset
+    
+    Atribut mata kuliah disimpan di array paralel (bit ke-i = mata kuliah ke-i,
+    urut kode_mk), KRS aktif dan mata kuliah yang sudah lulus tiap mahasiswa disimpan
+    sebagai bitset int, sehingga "tersedia" cukup dihitung dengan operasi bitwise.
+    Mata kuliah berstatus 'Tidak Lulus'/'Mengulang' tetap tersedia untuk diambil ulang.
+    """
+
+    __slots__ = ('ids', 'index_by_id', 'rows', 'sks', 'semester', 'kapasitas', 'terisi',
+                 'all_mask', 'semester_masks', 'sks_masks', 'full_mask', 'conflict_masks', 'enrolled', 'lulus')
+
+    JADWAL_PATTERN = re.compile(r'(\w+)\s+(\d{1,2}):(\d{2})\s*-\s*(\d{1,2}):(\d{2})')
+
+    def __init__(self, conn):
+        matkul_rows = conn.execute("""
+            SELECT id, kode_mk, nama_mk, sks, jadwal, dosen, ruang, semester, kapasitas
+            FROM mata_kuliah ORDER BY kode_mk
+        """).fetchall()
+        
+        self.ids = array('q', (row[0] for row in matkul_rows))
+        self.index_by_id = {mk_id: i for i, mk_id in enumerate(self.ids)}
+        self.rows = [row[1:7] for row in matkul_rows]
+        self.sks = array('i', (row[3] for row in matkul_rows))
+        self.semester = array('i', (row[7] for row in matkul_rows))
+        self.kapasitas = array('i', (row[8] for row in matkul_rows))
+        self.terisi = array('i', bytes(4 * len(matkul_rows)))
+        self.all_mask = (1 << len(matkul_rows)) - 1
+        
+        # semester_masks[s] = mata kuliah dengan semester <= s
+        max_semester = max(self.semester, default=0)
+        per_semester = [0] * (max_semester + 1)
+        for i, semester in enumerate(self.semester):
+            per_semester[max(semester, 0)] |= 1 << i
+        self.semester_masks = []
+        mask = 0
+        for bits in per_semester:
+            mask |= bits
+            self.semester_masks.append(mask)
+        
+        # sks_masks[r] = mata kuliah dengan sks <= r
+        max_sks = max(self.sks, default=0)
+        per_sks = [0] * (max_sks + 1)
+        for i, sks in enumerate(self.sks):
+            per_sks[max(sks, 0)] |= 1 << i
+        self.sks_masks = []
+        mask = 0
+        for bits in per_sks:
+            mask |= bits
+            self.sks_masks.append(mask)
+        
+        self.conflict_masks = self.build_conflict_masks(row[3] for row in self.rows)
+        
+        # Bitset KRS aktif dan lulus semua mahasiswa + jumlah peserta aktif tiap mata kuliah
+        self.enrolled = {}
+        self.lulus = {}
+        for mahasiswa_id, mata_kuliah_id, status in conn.execute(
+                "SELECT mahasiswa_id, mata_kuliah_id, status FROM krs WHERE status IN ('Aktif', 'Lulus')"):
+            i = self.index_by_id.get(mata_kuliah_id)
+            if i is None:
+                continue
+            if status == 'Aktif':
+                self.enrolled[mahasiswa_id] = self.enrolled.get(mahasiswa_id, 0) | (1 << i)
+                self.terisi[i] += 1
+            else:
+                self.lulus[mahasiswa_id] = self.lulus.get(mahasiswa_id, 0) | (1 << i)
+        self.full_mask = 0
+        for i in range(len(self.ids)):
+            self.update_full_bit(i)
+
+    @classmethod
+    def build_conflict_masks(cls, jadwal_list):
+        """conflict_masks[i] = mata kuliah lain yang jadwalnya bentrok dengan mata kuliah i"""
+        per_hari = {}
+        jadwal_list = list(jadwal_list)
+        for i, jadwal in enumerate(jadwal_list):
+            match = cls.JADWAL_PATTERN.search(jadwal or '')
+            if match:
+                hari, h1, m1, h2, m2 = match.groups()
+                per_hari.setdefault(hari.lower(), []).append((int(h1) * 60 + int(m1), int(h2) * 60 + int(m2), i))
+        
+        conflict_masks = [0] * len(jadwal_list)
+        for slots in per_hari.values():
+            slots.sort()
+            # Sweep: bandingkan hanya dengan slot yang mulai sebelum slot ini selesai
+            for a, (start_a, end_a, i) in enumerate(slots):
+                for start_b, end_b, j in slots[a + 1:]:
+                    if start_b >= end_a:
+                        break
+                    conflict_masks[i] |= 1 << j
+                    conflict_masks[j] |= 1 << i
+        return conflict_masks
+
+    def reload_mahasiswa(self, conn, mahasiswa_id):
+        """Muat ulang bitset satu mahasiswa dari database dan sesuaikan jumlah peserta"""
+        new_mask = 0
+        lulus_mask = 0
+        for mata_kuliah_id, status in conn.execute(
+                "SELECT mata_kuliah_id, status FROM krs WHERE mahasiswa_id=? AND status IN ('Aktif', 'Lulus')",
+                (mahasiswa_id,)):
+            i = self.index_by_id.get(mata_kuliah_id)
+            if i is None:
+                continue
+            if status == 'Aktif':
+                new_mask |= 1 << i
+            else:
+                lulus_mask |= 1 << i
+        
+        old_mask = self.enrolled.get(mahasiswa_id, 0)
+        for i in self.iter_bits(old_mask & ~new_mask):
+            self.terisi[i] -= 1
+            self.update_full_bit(i)
+        for i in self.iter_bits(new_mask & ~old_mask):
+            self.terisi[i] += 1
+            self.update_full_bit(i)
+        
+        if new_mask:
+            self.enrolled[mahasiswa_id] = new_mask
+        else:
+            self.enrolled.pop(mahasiswa_id, None)
+        if lulus_mask:
+            self.lulus[mahasiswa_id] = lulus_mask
+        else:
+            self.lulus.pop(mahasiswa_id, None)
+
+    def update_full_bit(self, i):
+        """Hitung ulang bit "penuh" dari jumlah peserta (kelas bisa terisi melebihi kapasitas)"""
+        if self.terisi[i] >= self.kapasitas[i]:
+            self.full_mask |= 1 << i
+        else:
+            self.full_mask &= ~(1 << i)
+
+    def available(self, mahasiswa_id, semester, sisa_sks=None, cek_kuota=False, cek_jadwal=False):
+        """Bitset mata kuliah yang bisa diambil, dengan filter opsional"""
+        enrolled = self.enrolled.get(mahasiswa_id, 0)
+        semester = min(max(semester, 0), len(self.semester_masks) - 1)
+        taken = enrolled | self.lulus.get(mahasiswa_id, 0)
+        mask = self.semester_masks[semester] & ~taken if self.semester_masks else 0
+        
+        if sisa_sks is not None:
+            mask &= self.sks_masks[min(sisa_sks, len(self.sks_masks) - 1)] if sisa_sks >= 0 else 0
+        if cek_kuota:
+            mask &= ~self.full_mask
+        if cek_jadwal:
+            bentrok = 0
+            for i in self.iter_bits(enrolled):
+                bentrok |= self.conflict_masks[i]
+            mask &= ~bentrok
+        return mask & self.all_mask
+
+    def enrolled_mask(self, mahasiswa_id):
+        return self.enrolled.get(mahasiswa_id, 0)
+
+    def rows_for(self, mask):
+        """Baris tampilan (kode, nama, sks, jadwal, dosen, ruang) untuk bit yang aktif, urut kode_mk"""
+        return [self.rows[i] for i in self.iter_bits(mask)]
+
+    @staticmethod
+    def iter_bits(mask):
+        while mask:
+            low = mask & -mask
+            yield low.bit_length() - 1
+            mask ^= low
+
+
+def hitung_statistik_jurusan(db_path, jurusan):
+    """Agregat KRS satu jurusan, dijalankan di proses worker dengan koneksi read-only"""
+    conn = sqlite3.connect(f"file:{pathname2url(os.path.abspath(db_path))}?mode=ro", uri=True)
+    try:
+        rows = conn.execute("""
+            SELECT m.max_sks, COUNT(mk.id), COALESCE(SUM(mk.sks), 0)
+            FROM mahasiswa m
+            LEFT JOIN krs k ON k.mahasiswa_id = m.id AND k.status = 'Aktif'
+            LEFT JOIN mata_kuliah mk ON k.mata_kuliah_id = mk.id
+            WHERE m.jurusan = ?
+            GROUP BY m.id
+        """, (jurusan,)).fetchall()
+    finally:
+        conn.close()
+    
+    stats = {'mahasiswa': 0, 'total_matkul': 0, 'total_sks': 0, 'melebihi': 0, 'kurang': 0}
+    for max_sks, total_matkul, total_sks in rows:
+        stats['mahasiswa'] += 1
+        stats['total_matkul'] += total_matkul
+        stats['total_sks'] += total_sks
+        if total_sks > max_sks:
+            stats['melebihi'] += 1
+        elif total_sks < max_sks:
+            stats['kurang'] += 1
+    return stats
+
+
+def gabung_statistik(partisi):
+    """Gabungkan agregat per jurusan menjadi statistik seluruh kampus"""
+    total = {'mahasiswa': 0, 'total_matkul': 0, 'total_sks': 0, 'melebihi': 0, 'kurang': 0}
+    for stats in partisi:
+        for key in total:
+            total[key] += stats[key]
+    return total
+
 
 class KRSAppFarhanAlfareza:
-    def __init__(self, root):
+    def __init__(self, root, db_path=None, in_memory=None):
         self.root = root
+        self.db_path = db_path or os.environ.get('KRS_DB_PATH', DB_PATH)
+        if in_memory is None:
+            in_memory = os.environ.get('KRS_DB_MEMORY') == '1'
+        self.in_memory = in_memory
         self.root.title("🎓 SISTEM KRS DIGITAL - FARHAN ALFAREZA")
         self.root.geometry("1200x800")
         self.root.configure(bg='#2c3e50')  # Background dark blue-gray
@@ -25,6 +441,23 @@ class KRSAppFarhanAlfareza:
         
         # Load initial data
         self.refresh_all_data()
+        
+        # Mulai polling perubahan dari instance lain
+        self.start_change_feed()
+        
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        
+        # Jadwal backup online berkala
+        self.backup_thread = None
+        self.backup_menunggu = False
+        self.root.after(BACKUP_INTERVAL_MS, self.scheduled_backup)
+        
+        # Mode in-memory: persist berkala ke disk
+        self.persist_thread = None
+        self.persist_callbacks = []
+        self.persisted_changes = None
+        if self.in_memory:
+            self.root.after(PERSIST_INTERVAL_MS, self.scheduled_persist)
 
     def setup_styles(self):
         """Setup custom styles dengan tema menarik"""
@@ -90,8 +523,25 @@ class KRSAppFarhanAlfareza:
 
     def setup_database(self):
         """Setup database dengan semua tabel yang diperlukan"""
-        self.conn = sqlite3.connect('farhan_krs.db')
+        if self.in_memory:
+            # Muat seluruh database dari disk ke memori, semua baca/tulis dilayani dari memori
+            # check_same_thread=False: thread persist menyalin langsung dari koneksi ini
+            self.conn = sqlite3.connect(':memory:', check_same_thread=False)
+            if os.path.exists(self.db_path):
+                disk = sqlite3.connect(self.db_path)
+                try:
+                    disk.backup(self.conn)
+                finally:
+                    disk.close()
+        else:
+            self.conn = sqlite3.connect(self.db_path)
         self.cursor = self.conn.cursor()
+        self.cache = QueryCache(self.conn)
+        self.write_queue = GroupCommitQueue(self.conn, schedule=self.root.after)
+        self.eligibility = None
+        self.report_executor = None
+        self.report_job = 0
+        self.laporan_semua = False
         
         # Tabel mahasiswa
         self.cursor.execute("""
@@ -121,20 +571,135 @@ class KRSAppFarhanAlfareza:
         """)
         
         # Tabel KRS
+        self.cursor.execute(self.krs_table_sql('krs'))
+        
+        # Change feed: diisi trigger, dibaca instance lain berdasarkan seq
         self.cursor.execute("""
-            CREATE TABLE IF NOT EXISTS krs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
+            CREATE TABLE IF NOT EXISTS perubahan_data (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                tabel TEXT NOT NULL,
+                row_id INTEGER NOT NULL,
                 mahasiswa_id INTEGER,
-                mata_kuliah_id INTEGER,
+                aksi TEXT NOT NULL
+            )
+        """)
+        self.setup_change_triggers()
+        
+        # Index untuk roster per mata kuliah (keyset pada mahasiswa_id) dan per dosen;
+        # index komposit menggantikan idx_krs_mata_kuliah yang lama
+        self.cursor.execute("DROP INDEX IF EXISTS idx_krs_mata_kuliah")
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_krs_mata_kuliah_mahasiswa ON krs (mata_kuliah_id, mahasiswa_id)")
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_mata_kuliah_dosen ON mata_kuliah (dosen)")
+        
+        # Index partisi laporan paralel per jurusan
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_mahasiswa_jurusan ON mahasiswa (jurusan)")
+        
+        # Riwayat KRS: event append-only + snapshot berkala untuk query "per tanggal"
+        self.cursor.execute("""
+            CREATE TABLE IF NOT EXISTS krs_event (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                mahasiswa_id INTEGER NOT NULL,
+                mata_kuliah_id INTEGER NOT NULL,
+                aksi TEXT NOT NULL,
+                status TEXT,
+                waktu TEXT NOT NULL,
+                operator TEXT NOT NULL
+            )
+        """)
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_krs_event_waktu ON krs_event (waktu)")
+        self.cursor.execute("""
+            CREATE TABLE IF NOT EXISTS krs_snapshot (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                event_id INTEGER NOT NULL,
+                waktu TEXT NOT NULL
+            )
+        """)
+        self.cursor.execute("""
+            CREATE TABLE IF NOT EXISTS krs_snapshot_data (
+                snapshot_id INTEGER NOT NULL,
+                mahasiswa_id INTEGER NOT NULL,
+                mata_kuliah_id INTEGER NOT NULL,
+                status TEXT
+            )
+        """)
+        self.cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_krs_snapshot_data
+            ON krs_snapshot_data (snapshot_id, mahasiswa_id)
+        """)
+        
+        try:
+            self.operator = getpass.getuser()
+        except Exception:
+            self.operator = 'unknown'
+        
+        # Snapshot awal menyimpan KRS yang sudah ada sebelum riwayat mulai dicatat
+        self.cursor.execute("SELECT COUNT(*) FROM krs_snapshot")
+        if self.cursor.fetchone()[0] == 0:
+            self.buat_snapshot_krs(commit=False)
+        
+        self.conn.commit()
+        
+        # Database lama: bangun ulang tabel krs dengan ON DELETE CASCADE, lalu aktifkan foreign key
+        self.migrasi_foreign_key_krs()
+        self.cursor.execute("PRAGMA foreign_keys = ON")
+
+    @staticmethod
+    def krs_table_sql(nama):
+        """DDL tabel KRS; baris KRS ikut terhapus saat mahasiswa/mata kuliah dihapus"""
+        return f"""
+            CREATE TABLE IF NOT EXISTS {nama} (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                mahasiswa_id INTEGER NOT NULL,
+                mata_kuliah_id INTEGER NOT NULL,
                 tanggal_ambil TEXT NOT NULL,
                 status TEXT DEFAULT 'Aktif',
-                FOREIGN KEY (mahasiswa_id) REFERENCES mahasiswa (id),
-                FOREIGN KEY (mata_kuliah_id) REFERENCES mata_kuliah (id),
+                FOREIGN KEY (mahasiswa_id) REFERENCES mahasiswa (id) ON DELETE CASCADE,
+                FOREIGN KEY (mata_kuliah_id) REFERENCES mata_kuliah (id) ON DELETE CASCADE,
                 UNIQUE(mahasiswa_id, mata_kuliah_id)
             )
-        """)
+        """
+
+    def migrasi_foreign_key_krs(self):
+        """Bangun ulang tabel krs lama (tanpa CASCADE) setelah membersihkan data yatim"""
+        self.cursor.execute("PRAGMA foreign_key_list(krs)")
+        on_delete = {row[6] for row in self.cursor.fetchall()}
+        if on_delete == {'CASCADE'}:
+            return
         
-        self.conn.commit()
+        # foreign_keys harus OFF saat tabel yang direferensikan di-drop/rename
+        self.cursor.execute("PRAGMA foreign_keys = OFF")
+        self.cursor.execute("BEGIN")
+        try:
+            self.cek_integritas(perbaiki=True, commit=False)
+            self.cursor.execute(self.krs_table_sql('krs_baru'))
+            self.cursor.execute("""
+                INSERT INTO krs_baru (id, mahasiswa_id, mata_kuliah_id, tanggal_ambil, status)
+                SELECT id, mahasiswa_id, mata_kuliah_id, tanggal_ambil, status FROM krs
+            """)
+            self.cursor.execute("DROP TABLE krs")
+            self.cursor.execute("ALTER TABLE krs_baru RENAME TO krs")
+            
+            # Index dan trigger ikut terhapus bersama tabel lama
+            self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_krs_mata_kuliah_mahasiswa ON krs (mata_kuliah_id, mahasiswa_id)")
+            self.setup_change_triggers()
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+
+    def setup_change_triggers(self):
+        """Buat trigger yang mencatat setiap INSERT/UPDATE/DELETE ke tabel perubahan_data"""
+        for tabel, mhs_col in (('mahasiswa', 'id'), ('mata_kuliah', None), ('krs', 'mahasiswa_id')):
+            for aksi, ref in (('INSERT', 'NEW'), ('UPDATE', 'NEW'), ('DELETE', 'OLD')):
+                mhs_expr = f"{ref}.{mhs_col}" if mhs_col else "NULL"
+                self.cursor.execute(f"""
+                    CREATE TRIGGER IF NOT EXISTS trg_{tabel}_{aksi.lower()}
+                    AFTER {aksi} ON {tabel}
+                    BEGIN
+                        INSERT INTO perubahan_data (tabel, row_id, mahasiswa_id, aksi)
+                        VALUES ('{tabel}', {ref}.id, {mhs_expr}, '{aksi}');
+                    END
+                """)
 
     def init_sample_data(self):
         """Initialize dengan data contoh jika database kosong"""
@@ -195,6 +760,15 @@ class KRSAppFarhanAlfareza:
                                  bg='#2c3e50', fg='#e74c3c')
         subtitle_label.pack()
         
+        # Tombol backup/restore di pojok kanan header
+        backup_frame = tk.Frame(header_frame, bg='#2c3e50')
+        backup_frame.place(relx=1.0, rely=0.5, anchor='e')
+        ttk.Button(backup_frame, text="💾 BACKUP", command=self.backup_sekarang, style='Orange.TButton').pack(side='left', padx=5)
+        ttk.Button(backup_frame, text="♻️ RESTORE", command=self.restore_backup, style='Orange.TButton').pack(side='left', padx=5)
+        ttk.Button(backup_frame, text="🩺 CEK INTEGRITAS", command=self.cek_integritas_gui, style='Orange.TButton').pack(side='left', padx=5)
+        self.backup_label = tk.Label(header_frame, text="", font=('Arial', 9), bg='#2c3e50', fg='#bdc3c7')
+        self.backup_label.place(relx=1.0, rely=1.0, anchor='se')
+        
         # Main notebook
         self.notebook = ttk.Notebook(self.root, style='Custom.TNotebook')
         self.notebook.pack(fill='both', expand=True, padx=15, pady=10)
@@ -204,6 +778,9 @@ class KRSAppFarhanAlfareza:
         self.create_matkul_tab()
         self.create_krs_tab()
         self.create_laporan_tab()
+        self.create_roster_tab()
+        
+        self.notebook.bind('<<NotebookTabChanged>>', self.on_tab_changed)
 
     def create_mahasiswa_tab(self):
         """Tab manajemen mahasiswa"""
@@ -243,6 +820,7 @@ class KRSAppFarhanAlfareza:
         ttk.Button(btn_frame, text="➕ TAMBAH", command=self.tambah_mahasiswa, style='Orange.TButton').pack(side='left', padx=5)
         ttk.Button(btn_frame, text="✏️ UPDATE", command=self.update_mahasiswa, style='Orange.TButton').pack(side='left', padx=5)
         ttk.Button(btn_frame, text="🗑️ HAPUS", command=self.hapus_mahasiswa, style='Orange.TButton').pack(side='left', padx=5)
+        ttk.Button(btn_frame, text="🗑️ HAPUS ANGKATAN", command=self.hapus_angkatan, style='Orange.TButton').pack(side='left', padx=5)
         ttk.Button(btn_frame, text="🔄 CLEAR", command=self.clear_mahasiswa_form, style='Orange.TButton').pack(side='left', padx=5)
         
         # Data display frame
@@ -333,6 +911,19 @@ class KRSAppFarhanAlfareza:
                                   font=('Arial', 12, 'bold'), bg='#3498db', fg='white')
         self.info_label.pack(expand=True)
         
+        # Filter opsional daftar mata kuliah tersedia
+        filter_frame = tk.Frame(select_frame, bg='#ecf0f1')
+        filter_frame.grid(row=2, column=0, columnspan=2, sticky='w', padx=10, pady=(0, 10))
+        self.filter_sks = tk.BooleanVar(value=False)
+        self.filter_kuota = tk.BooleanVar(value=False)
+        self.filter_jadwal = tk.BooleanVar(value=False)
+        for text, var in (("Muat sisa SKS", self.filter_sks),
+                          ("Kuota tersedia", self.filter_kuota),
+                          ("Tanpa bentrok jadwal", self.filter_jadwal)):
+            tk.Checkbutton(filter_frame, text=text, variable=var, command=self.refresh_krs_data,
+                           font=('Arial', 10, 'bold'), bg='#ecf0f1', fg='#27ae60',
+                           activebackground='#ecf0f1').pack(side='left', padx=10)
+        
         select_frame.columnconfigure(1, weight=1)
         
         # Main content frame
@@ -412,6 +1003,12 @@ class KRSAppFarhanAlfareza:
         
         ttk.Button(control_frame, text="📋 LIHAT SEMUA", command=self.lihat_semua_laporan, style='Orange.TButton').grid(row=0, column=2, padx=20, pady=10)
         ttk.Button(control_frame, text="🖨️ CETAK KRS", command=self.cetak_krs, style='Orange.TButton').grid(row=0, column=3, padx=10, pady=10)
+        ttk.Button(control_frame, text="✏️ UBAH STATUS", command=self.ubah_status_terpilih, style='Orange.TButton').grid(row=0, column=4, padx=10, pady=10)
+        
+        tk.Label(control_frame, text="Per Tanggal:", font=('Arial', 12, 'bold'), bg='#ecf0f1', fg='#27ae60').grid(row=1, column=0, padx=10, pady=10)
+        self.entry_per_tanggal = ttk.Entry(control_frame, width=25, style='Custom.TEntry')
+        self.entry_per_tanggal.grid(row=1, column=1, padx=10, pady=10, sticky='w')
+        tk.Label(control_frame, text="(YYYY-MM-DD [HH:MM:SS], kosong = sekarang)", font=('Arial', 9), bg='#ecf0f1', fg='#7f8c8d').grid(row=1, column=2, columnspan=2, padx=10, pady=10, sticky='w')
         
         control_frame.columnconfigure(1, weight=1)
         
@@ -452,6 +1049,90 @@ class KRSAppFarhanAlfareza:
         self.laporan_tree.pack(side='left', fill='both', expand=True)
         scrollbar_lap.pack(side='right', fill='y')
 
+    def create_roster_tab(self):
+        """Tab roster kelas per dosen / mata kuliah"""
+        roster_frame = tk.Frame(self.notebook, bg='#ecf0f1')
+        self.notebook.add(roster_frame, text="👨‍🏫 ROSTER DOSEN")
+        self.roster_tab = roster_frame
+        
+        # Control frame
+        control_frame = ttk.LabelFrame(roster_frame, text="🔍 PILIH DOSEN", style='Green.TLabelframe')
+        control_frame.pack(fill='x', padx=20, pady=15)
+        
+        tk.Label(control_frame, text="Dosen:", font=('Arial', 12, 'bold'), bg='#ecf0f1', fg='#27ae60').grid(row=0, column=0, padx=10, pady=10)
+        self.dosen_combo = ttk.Combobox(control_frame, width=40, state='readonly', font=('Arial', 10))
+        self.dosen_combo.grid(row=0, column=1, padx=10, pady=10)
+        self.dosen_combo.bind('<<ComboboxSelected>>', self.refresh_roster_matkul)
+        
+        ttk.Button(control_frame, text="📤 EKSPOR ROSTER DOSEN", command=self.ekspor_roster_dosen, style='Orange.TButton').grid(row=0, column=2, padx=10, pady=10)
+        ttk.Button(control_frame, text="📦 EKSPOR SEMUA ROSTER", command=self.ekspor_semua_roster, style='Orange.TButton').grid(row=0, column=3, padx=10, pady=10)
+        
+        control_frame.columnconfigure(1, weight=1)
+        
+        content_frame = tk.Frame(roster_frame, bg='#ecf0f1')
+        content_frame.pack(fill='both', expand=True, padx=20, pady=5)
+        
+        # Mata kuliah yang diampu + jumlah peserta
+        matkul_frame = ttk.LabelFrame(content_frame, text="📚 MATA KULIAH DIAMPU", style='Green.TLabelframe')
+        matkul_frame.pack(side='left', fill='both', expand=True, padx=(0, 10))
+        
+        mk_tree_frame = tk.Frame(matkul_frame, bg='#ecf0f1')
+        mk_tree_frame.pack(fill='both', expand=True, padx=10, pady=10)
+        
+        mk_columns = ('Kode', 'Nama', 'Jadwal', 'Ruang', 'Peserta')
+        self.roster_matkul_tree = ttk.Treeview(mk_tree_frame, columns=mk_columns, show='headings', style='Custom.Treeview')
+        self.roster_matkul_tree.column('Kode', width=60, anchor='center')
+        self.roster_matkul_tree.column('Nama', width=150)
+        self.roster_matkul_tree.column('Jadwal', width=130)
+        self.roster_matkul_tree.column('Ruang', width=60, anchor='center')
+        self.roster_matkul_tree.column('Peserta', width=110, anchor='center')
+        for col in mk_columns:
+            self.roster_matkul_tree.heading(col, text=col)
+        self.roster_matkul_tree.tag_configure('penuh', foreground='#e74c3c')
+        
+        scrollbar_rmk = ttk.Scrollbar(mk_tree_frame, orient='vertical', command=self.roster_matkul_tree.yview)
+        self.roster_matkul_tree.configure(yscrollcommand=scrollbar_rmk.set)
+        
+        self.roster_matkul_tree.pack(side='left', fill='both', expand=True)
+        scrollbar_rmk.pack(side='right', fill='y')
+        
+        self.roster_matkul_tree.bind('<<TreeviewSelect>>', self.on_roster_matkul_selected)
+        
+        # Daftar peserta per halaman
+        peserta_frame = ttk.LabelFrame(content_frame, text="👥 PESERTA KELAS", style='Green.TLabelframe')
+        peserta_frame.pack(side='right', fill='both', expand=True, padx=(10, 0))
+        
+        ps_tree_frame = tk.Frame(peserta_frame, bg='#ecf0f1')
+        ps_tree_frame.pack(fill='both', expand=True, padx=10, pady=10)
+        
+        ps_columns = ('NIM', 'Nama', 'Jurusan', 'Semester', 'Tanggal Ambil', 'Status')
+        self.roster_tree = ttk.Treeview(ps_tree_frame, columns=ps_columns, show='headings', style='Custom.Treeview')
+        self.roster_tree.column('NIM', width=90, anchor='center')
+        self.roster_tree.column('Nama', width=150)
+        self.roster_tree.column('Jurusan', width=130)
+        self.roster_tree.column('Semester', width=70, anchor='center')
+        self.roster_tree.column('Tanggal Ambil', width=140, anchor='center')
+        self.roster_tree.column('Status', width=70, anchor='center')
+        for col in ps_columns:
+            self.roster_tree.heading(col, text=col)
+        
+        scrollbar_ps = ttk.Scrollbar(ps_tree_frame, orient='vertical', command=self.roster_tree.yview)
+        self.roster_tree.configure(yscrollcommand=scrollbar_ps.set)
+        
+        self.roster_tree.pack(side='left', fill='both', expand=True)
+        scrollbar_ps.pack(side='right', fill='y')
+        
+        nav_frame = tk.Frame(peserta_frame, bg='#ecf0f1')
+        nav_frame.pack(fill='x', padx=10, pady=(0, 10))
+        ttk.Button(nav_frame, text="◀ SEBELUMNYA", command=self.roster_halaman_sebelumnya, style='Orange.TButton').pack(side='left')
+        ttk.Button(nav_frame, text="BERIKUTNYA ▶", command=self.roster_halaman_berikutnya, style='Orange.TButton').pack(side='right')
+        self.roster_page_label = tk.Label(nav_frame, text="", font=('Arial', 11, 'bold'), bg='#ecf0f1', fg='#2c3e50')
+        self.roster_page_label.pack(expand=True)
+        
+        self.roster_mk_id = None
+        self.roster_page_keys = []
+        self.roster_next_key = None
+
     # Mahasiswa management functions
     def tambah_mahasiswa(self):
         """Tambah mahasiswa baru"""
@@ -469,22 +1150,27 @@ class KRSAppFarhanAlfareza:
             semester = int(semester)
             max_sks = int(max_sks)
             
+        except ValueError:
+            messagebox.showerror("Error! ❌", "Semester dan Max SKS harus berupa angka!")
+            return
+        
+        def operation():
             self.cursor.execute("""
                 INSERT INTO mahasiswa (nim, nama, jurusan, semester, max_sks)
                 VALUES (?, ?, ?, ?, ?)
             """, (nim, nama, jurusan, semester, max_sks))
-            self.conn.commit()
-            
-            messagebox.showinfo("Sukses! 🎉", f"Mahasiswa {nama} berhasil ditambahkan!")
-            self.clear_mahasiswa_form()
-            self.refresh_mahasiswa()
-            
-        except sqlite3.IntegrityError:
-            messagebox.showerror("Error! ❌", "NIM sudah terdaftar!")
-        except ValueError:
-            messagebox.showerror("Error! ❌", "Semester dan Max SKS harus berupa angka!")
-        except Exception as e:
-            messagebox.showerror("Error! ❌", f"Terjadi kesalahan: {str(e)}")
+        
+        def on_done(ok, result):
+            if ok:
+                messagebox.showinfo("Sukses! 🎉", f"Mahasiswa {nama} berhasil ditambahkan!")
+                self.clear_mahasiswa_form()
+                self.refresh_mahasiswa()
+            elif isinstance(result, sqlite3.IntegrityError):
+                messagebox.showerror("Error! ❌", "NIM sudah terdaftar!")
+            else:
+                messagebox.showerror("Error! ❌", f"Terjadi kesalahan: {str(result)}")
+        
+        self.write_queue.submit(operation, on_done)
 
     def update_mahasiswa(self):
         """Update data mahasiswa"""
@@ -510,47 +1196,85 @@ class KRSAppFarhanAlfareza:
             semester = int(semester)
             max_sks = int(max_sks)
             
+        except ValueError:
+            messagebox.showerror("Error! ❌", "Semester dan Max SKS harus berupa angka!")
+            return
+        
+        def operation():
             self.cursor.execute("""
                 UPDATE mahasiswa SET nim=?, nama=?, jurusan=?, semester=?, max_sks=?
                 WHERE id=?
             """, (nim, nama, jurusan, semester, max_sks, mahasiswa_id))
-            self.conn.commit()
-            
-            messagebox.showinfo("Sukses! 🎉", f"Data mahasiswa {nama} berhasil diupdate!")
-            self.clear_mahasiswa_form()
-            self.refresh_mahasiswa()
-            
-        except sqlite3.IntegrityError:
-            messagebox.showerror("Error! ❌", "NIM sudah terdaftar!")
-        except ValueError:
-            messagebox.showerror("Error! ❌", "Semester dan Max SKS harus berupa angka!")
-        except Exception as e:
-            messagebox.showerror("Error! ❌", f"Terjadi kesalahan: {str(e)}")
+        
+        def on_done(ok, result):
+            if ok:
+                messagebox.showinfo("Sukses! 🎉", f"Data mahasiswa {nama} berhasil diupdate!")
+                self.clear_mahasiswa_form()
+                self.refresh_mahasiswa()
+            elif isinstance(result, sqlite3.IntegrityError):
+                messagebox.showerror("Error! ❌", "NIM sudah terdaftar!")
+            else:
+                messagebox.showerror("Error! ❌", f"Terjadi kesalahan: {str(result)}")
+        
+        self.write_queue.submit(operation, on_done)
 
     def hapus_mahasiswa(self):
-        """Hapus mahasiswa"""
+        """Hapus mahasiswa (bisa beberapa sekaligus dengan Ctrl/Shift-klik)"""
         selected = self.mahasiswa_tree.selection()
         if not selected:
             messagebox.showwarning("Pilih Data! ⚠️", "Pilih mahasiswa yang akan dihapus!")
             return
         
-        item = self.mahasiswa_tree.item(selected[0])
-        mahasiswa_id = item['values'][0]
-        nama = item['values'][2]
+        items = [self.mahasiswa_tree.item(iid)['values'] for iid in selected]
+        mahasiswa_ids = [values[0] for values in items]
+        nama = items[0][2] if len(items) == 1 else f"{len(items)} mahasiswa"
         
         result = messagebox.askyesno("Konfirmasi Hapus! 🗑️", f"Yakin hapus data mahasiswa {nama}?\nSemua data KRS akan ikut terhapus!")
         if result:
-            try:
-                self.cursor.execute("DELETE FROM krs WHERE mahasiswa_id=?", (mahasiswa_id,))
-                self.cursor.execute("DELETE FROM mahasiswa WHERE id=?", (mahasiswa_id,))
-                self.conn.commit()
-                
-                messagebox.showinfo("Sukses! 🎉", f"Data mahasiswa {nama} berhasil dihapus!")
+            placeholders = ','.join(['?'] * len(mahasiswa_ids))
+            self.hapus_mahasiswa_where(f"id IN ({placeholders})", mahasiswa_ids, nama)
+
+    def hapus_angkatan(self):
+        """Hapus satu angkatan (prefix NIM) sekaligus"""
+        prefix = simpledialog.askstring("Hapus Angkatan 🗑️", "Prefix NIM angkatan (mis. 2023):", parent=self.root)
+        if not prefix or not prefix.strip():
+            return
+        prefix = prefix.strip()
+        
+        # Rentang nim >= prefix AND nim < prefix + U+FFFF memakai index UNIQUE pada nim
+        where_sql, params = "nim >= ? AND nim < ?", (prefix, prefix + '\uffff')
+        self.cursor.execute(f"SELECT COUNT(*) FROM mahasiswa WHERE {where_sql}", params)
+        jumlah = self.cursor.fetchone()[0]
+        if jumlah == 0:
+            messagebox.showinfo("Hapus Angkatan 🗑️", f"Tidak ada mahasiswa dengan NIM berawalan {prefix}!")
+            return
+        
+        if messagebox.askyesno("Konfirmasi Hapus! 🗑️", f"Yakin hapus {jumlah} mahasiswa angkatan {prefix}?\nSemua data KRS akan ikut terhapus!"):
+            self.hapus_mahasiswa_where(where_sql, params, f"{jumlah} mahasiswa angkatan {prefix}")
+
+    def hapus_mahasiswa_where(self, where_sql, params, nama):
+        """Hapus mahasiswa secara set-based; KRS ikut terhapus lewat ON DELETE CASCADE"""
+        params = tuple(params)
+        
+        def operation():
+            self.cursor.execute(f"""
+                INSERT INTO krs_event (mahasiswa_id, mata_kuliah_id, aksi, status, waktu, operator)
+                SELECT mahasiswa_id, mata_kuliah_id, 'BATAL', NULL, ?, ? FROM krs
+                WHERE mahasiswa_id IN (SELECT id FROM mahasiswa WHERE {where_sql})
+            """, (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), self.operator) + params)
+            self.cursor.execute(f"DELETE FROM mahasiswa WHERE {where_sql}", params)
+        
+        def on_done(ok, result):
+            if ok:
+                self.maybe_snapshot_krs()
+                self.eligibility = None
+                messagebox.showinfo("Sukses! 🎉", f"Data {nama} berhasil dihapus!")
                 self.clear_mahasiswa_form()
                 self.refresh_mahasiswa()
-                
-            except Exception as e:
-                messagebox.showerror("Error! ❌", f"Terjadi kesalahan: {str(e)}")
+            else:
+                messagebox.showerror("Error! ❌", f"Terjadi kesalahan: {str(result)}")
+        
+        self.write_queue.submit(operation, on_done)
 
     def select_mahasiswa(self, event):
         """Handle selection mahasiswa"""
@@ -626,49 +1350,40 @@ class KRSAppFarhanAlfareza:
             self.enrolled_tree.delete(item)
         
         # Get mahasiswa ID
-        self.cursor.execute("SELECT id, semester FROM mahasiswa WHERE nim=?", (self.current_nim,))
-        mhs_data = self.cursor.fetchone()
-        if not mhs_data:
+        mhs_rows = self.cache.query("SELECT id, semester, max_sks FROM mahasiswa WHERE nim=?", (self.current_nim,))
+        if not mhs_rows:
             return
         
-        mahasiswa_id, semester = mhs_data
+        mahasiswa_id, semester, max_sks = mhs_rows[0]
+        engine = self.get_eligibility()
+        enrolled_mask = engine.enrolled_mask(mahasiswa_id)
         
-        # Get enrolled mata kuliah IDs
-        self.cursor.execute("SELECT mata_kuliah_id FROM krs WHERE mahasiswa_id=? AND status='Aktif'", (mahasiswa_id,))
-        enrolled_ids = [row[0] for row in self.cursor.fetchall()]
+        # Load available mata kuliah (not enrolled, same or lower semester) via bitset
+        sisa_sks = None
+        if self.filter_sks.get():
+            sisa_sks = max_sks - sum(engine.sks[i] for i in engine.iter_bits(enrolled_mask))
+        available_mask = engine.available(mahasiswa_id, semester, sisa_sks=sisa_sks,
+                                          cek_kuota=self.filter_kuota.get(),
+                                          cek_jadwal=self.filter_jadwal.get())
         
-        # Load available mata kuliah (not enrolled, same or lower semester)
-        if enrolled_ids:
-            placeholders = ','.join(['?'] * len(enrolled_ids))
-            self.cursor.execute(f"""
-                SELECT kode_mk, nama_mk, sks, jadwal, dosen, ruang
-                FROM mata_kuliah 
-                WHERE id NOT IN ({placeholders}) AND semester <= ?
-                ORDER BY kode_mk
-            """, enrolled_ids + [semester])
-        else:
-            self.cursor.execute("""
-                SELECT kode_mk, nama_mk, sks, jadwal, dosen, ruang
-                FROM mata_kuliah 
-                WHERE semester <= ?
-                ORDER BY kode_mk
-            """, (semester,))
-        
-        for row in self.cursor.fetchall():
+        for row in engine.rows_for(available_mask):
             self.available_tree.insert('', 'end', values=row)
         
         # Load enrolled mata kuliah
-        self.cursor.execute("""
-            SELECT mk.kode_mk, mk.nama_mk, mk.sks, mk.jadwal, mk.dosen, mk.ruang
-            FROM krs k
-            JOIN mata_kuliah mk ON k.mata_kuliah_id = mk.id
-            WHERE k.mahasiswa_id=? AND k.status='Aktif'
-            ORDER BY mk.kode_mk
-        """, (mahasiswa_id,))
-        
-        for row in self.cursor.fetchall():
+        for row in engine.rows_for(enrolled_mask):
             self.enrolled_tree.insert('', 'end', values=row)
 
+    def get_eligibility(self):
+        """Engine eligibility, dibangun ulang jika katalog mata kuliah berubah"""
+        if self.eligibility is None:
+            self.eligibility = EligibilityEngine(self.conn)
+        return self.eligibility
+
+    def krs_mahasiswa_berubah(self, mahasiswa_id):
+        """Perbarui bitset KRS satu mahasiswa setelah ambil/batal/hapus"""
+        if self.eligibility is not None:
+            self.eligibility.reload_mahasiswa(self.conn, mahasiswa_id)
+
     def ambil_matkul(self):
         """Ambil mata kuliah"""
         if not hasattr(self, 'current_nim'):
@@ -701,34 +1416,53 @@ class KRSAppFarhanAlfareza:
         
         mata_kuliah_id = mk_data[0]
         
-        # Check current SKS
-        self.cursor.execute("""
-            SELECT SUM(mk.sks) FROM krs k
-            JOIN mata_kuliah mk ON k.mata_kuliah_id = mk.id
-            WHERE k.mahasiswa_id=? AND k.status='Aktif'
-        """, (mahasiswa_id,))
-        current_sks = self.cursor.fetchone()[0] or 0
-        
-        if current_sks + sks > max_sks:
-            messagebox.showwarning("Batas SKS! ⚠️", f"Total SKS akan melebihi batas maksimal!\nCurrent: {current_sks} + {sks} = {current_sks + sks} > {max_sks}")
-            return
-        
-        try:
-            tanggal_ambil = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        def operation():
+            # Cek SKS di dalam transaksi batch, sehingga AMBIL lain di batch yang sama ikut terhitung
             self.cursor.execute("""
-                INSERT INTO krs (mahasiswa_id, mata_kuliah_id, tanggal_ambil, status)
-                VALUES (?, ?, ?, 'Aktif')
-            """, (mahasiswa_id, mata_kuliah_id, tanggal_ambil))
-            self.conn.commit()
-            
-            messagebox.showinfo("Sukses! 🎉", f"Berhasil mengambil mata kuliah {nama_mk}!")
-            self.update_krs_info()
-            self.refresh_krs_data()
+                SELECT SUM(mk.sks) FROM krs k
+                JOIN mata_kuliah mk ON k.mata_kuliah_id = mk.id
+                WHERE k.mahasiswa_id=? AND k.status='Aktif'
+            """, (mahasiswa_id,))
+            current_sks = self.cursor.fetchone()[0] or 0
+            if current_sks + sks > max_sks:
+                raise BatasSKSError(f"Total SKS akan melebihi batas maksimal!\nCurrent: {current_sks} + {sks} = {current_sks + sks} > {max_sks}")
             
-        except sqlite3.IntegrityError:
-            messagebox.showwarning("Sudah Terdaftar! ⚠️", "Mata kuliah sudah diambil!")
-        except Exception as e:
-            messagebox.showerror("Error! ❌", f"Terjadi kesalahan: {str(e)}")
+            tanggal_ambil = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            self.cursor.execute("SELECT status FROM krs WHERE mahasiswa_id=? AND mata_kuliah_id=?",
+                                (mahasiswa_id, mata_kuliah_id))
+            existing = self.cursor.fetchone()
+            if existing is None:
+                self.cursor.execute("""
+                    INSERT INTO krs (mahasiswa_id, mata_kuliah_id, tanggal_ambil, status)
+                    VALUES (?, ?, ?, 'Aktif')
+                """, (mahasiswa_id, mata_kuliah_id, tanggal_ambil))
+            elif existing[0] in ('Aktif', 'Lulus'):
+                raise KRSSudahAdaError(f"Mata kuliah {nama_mk} sudah berstatus {existing[0]}!")
+            else:
+                # Ambil ulang ('Tidak Lulus'/'Mengulang'): baris lama diaktifkan kembali
+                self.cursor.execute("""
+                    UPDATE krs SET status='Aktif', tanggal_ambil=?
+                    WHERE mahasiswa_id=? AND mata_kuliah_id=?
+                """, (tanggal_ambil, mahasiswa_id, mata_kuliah_id))
+            self.catat_event_krs(mahasiswa_id, mata_kuliah_id, 'AMBIL', 'Aktif', tanggal_ambil)
+        
+        def on_done(ok, result):
+            if ok:
+                self.maybe_snapshot_krs()
+                self.krs_mahasiswa_berubah(mahasiswa_id)
+                messagebox.showinfo("Sukses! 🎉", f"Berhasil mengambil mata kuliah {nama_mk}!")
+                self.update_krs_info()
+                self.refresh_krs_data()
+            elif isinstance(result, BatasSKSError):
+                messagebox.showwarning("Batas SKS! ⚠️", str(result))
+            elif isinstance(result, KRSSudahAdaError):
+                messagebox.showwarning("Sudah Terdaftar! ⚠️", str(result))
+            elif isinstance(result, sqlite3.IntegrityError):
+                messagebox.showwarning("Sudah Terdaftar! ⚠️", "Mata kuliah sudah diambil!")
+            else:
+                messagebox.showerror("Error! ❌", f"Terjadi kesalahan: {str(result)}")
+        
+        self.write_queue.submit(operation, on_done)
 
     def batal_matkul(self):
         """Batalkan mata kuliah"""
@@ -747,9 +1481,11 @@ class KRSAppFarhanAlfareza:
         
         result = messagebox.askyesno("Konfirmasi! 🤔", f"Yakin batalkan mata kuliah {nama_mk}?")
         if result:
-            try:
+            current_nim = self.current_nim
+            
+            def operation():
                 # Get IDs
-                self.cursor.execute("SELECT id FROM mahasiswa WHERE nim=?", (self.current_nim,))
+                self.cursor.execute("SELECT id FROM mahasiswa WHERE nim=?", (current_nim,))
                 mahasiswa_id = self.cursor.fetchone()[0]
                 
                 self.cursor.execute("SELECT id FROM mata_kuliah WHERE kode_mk=?", (kode_mk,))
@@ -759,14 +1495,197 @@ class KRSAppFarhanAlfareza:
                     DELETE FROM krs 
                     WHERE mahasiswa_id=? AND mata_kuliah_id=?
                 """, (mahasiswa_id, mata_kuliah_id))
-                self.conn.commit()
-                
-                messagebox.showinfo("Sukses! 🎉", f"Mata kuliah {nama_mk} berhasil dibatalkan!")
-                self.update_krs_info()
-                self.refresh_krs_data()
-                
-            except Exception as e:
-                messagebox.showerror("Error! ❌", f"Terjadi kesalahan: {str(e)}")
+                self.catat_event_krs(mahasiswa_id, mata_kuliah_id, 'BATAL', None)
+                return mahasiswa_id
+            
+            def on_done(ok, result):
+                if ok:
+                    self.maybe_snapshot_krs()
+                    self.krs_mahasiswa_berubah(result)
+                    messagebox.showinfo("Sukses! 🎉", f"Mata kuliah {nama_mk} berhasil dibatalkan!")
+                    self.update_krs_info()
+                    self.refresh_krs_data()
+                else:
+                    messagebox.showerror("Error! ❌", f"Terjadi kesalahan: {str(result)}")
+            
+            self.write_queue.submit(operation, on_done)
+
+    # Riwayat KRS functions
+    def catat_event_krs(self, mahasiswa_id, mata_kuliah_id, aksi, status, waktu=None):
+        """Catat event KRS (AMBIL/BATAL/STATUS) ke log append-only, commit oleh pemanggil"""
+        if waktu is None:
+            waktu = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.cursor.execute("""
+            INSERT INTO krs_event (mahasiswa_id, mata_kuliah_id, aksi, status, waktu, operator)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (mahasiswa_id, mata_kuliah_id, aksi, status, waktu, self.operator))
+
+    def ubah_status_krs(self, mahasiswa_id, mata_kuliah_id, status, callback=None):
+        """Ubah status KRS (mis. 'Aktif' -> 'Lulus') lewat antrian tulis dan catat sebagai event"""
+        def operation():
+            self.cursor.execute("""
+                UPDATE krs SET status=? WHERE mahasiswa_id=? AND mata_kuliah_id=?
+            """, (status, mahasiswa_id, mata_kuliah_id))
+            if not self.cursor.rowcount:
+                return False
+            self.catat_event_krs(mahasiswa_id, mata_kuliah_id, 'STATUS', status)
+            return True
+        
+        def on_done(ok, result):
+            if ok and result:
+                self.maybe_snapshot_krs()
+                self.krs_mahasiswa_berubah(mahasiswa_id)
+            elif ok:
+                # Mis. baris dipilih dari laporan per tanggal dan sudah dibatalkan
+                messagebox.showwarning("Data Tidak Ditemukan! ⚠️", "Baris KRS ini sudah tidak ada, status tidak diubah!")
+            if callback:
+                callback(ok, result)
+        
+        self.write_queue.submit(operation, on_done)
+
+    def ubah_status_terpilih(self):
+        """Ubah status baris KRS yang dipilih di tabel laporan"""
+        selected = self.laporan_tree.selection()
+        if not selected:
+            messagebox.showwarning("Pilih Data! ⚠️", "Pilih baris KRS yang akan diubah statusnya!")
+            return
+        
+        values = self.laporan_tree.item(selected[0])['values']
+        nim, kode_mk, nama_mk = str(values[0]), str(values[2]), values[3]
+        status = simpledialog.askstring("Ubah Status ✏️", f"Status baru untuk {nama_mk} ({' / '.join(STATUS_KRS)}):",
+                                        initialvalue=values[7], parent=self.root)
+        if status is None:
+            return
+        status = status.strip()
+        if status not in STATUS_KRS:
+            messagebox.showwarning("Status Tidak Valid! ⚠️", f"Status harus salah satu dari: {', '.join(STATUS_KRS)}")
+            return
+        
+        mahasiswa_id = self.mahasiswa_id_by_nim(nim)
+        mk_rows = self.cache.query("SELECT id FROM mata_kuliah WHERE kode_mk=?", (kode_mk,))
+        if mahasiswa_id is None or not mk_rows:
+            return
+        
+        def on_done(ok, result):
+            if not ok:
+                messagebox.showerror("Error! ❌", f"Terjadi kesalahan: {str(result)}")
+            elif self.laporan_semua:
+                self.lihat_semua_laporan()
+            else:
+                self.generate_laporan(None)
+        
+        self.ubah_status_krs(mahasiswa_id, mk_rows[0][0], status, on_done)
+
+    def buat_snapshot_krs(self, commit=True):
+        """Simpan state tabel krs saat ini sebagai snapshot, lalu padatkan snapshot lama"""
+        self.cursor.execute("SELECT COALESCE(MAX(id), 0) FROM krs_event")
+        event_id = self.cursor.fetchone()[0]
+        self.cursor.execute("INSERT INTO krs_snapshot (event_id, waktu) VALUES (?, ?)",
+                            (event_id, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+        snapshot_id = self.cursor.lastrowid
+        self.cursor.execute("""
+            INSERT INTO krs_snapshot_data (snapshot_id, mahasiswa_id, mata_kuliah_id, status)
+            SELECT ?, mahasiswa_id, mata_kuliah_id, status FROM krs
+        """, (snapshot_id,))
+        
+        # Compaction (thinning): baseline, N snapshot terbaru, satu snapshot per hari selama
+        # SNAPSHOT_HARIAN_HARI hari terakhir, dan satu per minggu sebelumnya. Query "per tanggal"
+        # di tengah riwayat paling jauh me-replay event satu minggu. Event tidak pernah dihapus.
+        batas_harian = (datetime.now() - timedelta(days=SNAPSHOT_HARIAN_HARI)).strftime("%Y-%m-%d")
+        self.cursor.execute("""
+            SELECT id FROM krs_snapshot
+            WHERE id != (SELECT MIN(id) FROM krs_snapshot)
+              AND id NOT IN (SELECT id FROM krs_snapshot ORDER BY id DESC LIMIT ?)
+              AND id NOT IN (SELECT MAX(id) FROM krs_snapshot WHERE waktu >= ? GROUP BY date(waktu))
+              AND id NOT IN (SELECT MAX(id) FROM krs_snapshot WHERE waktu < ? GROUP BY strftime('%Y-%W', waktu))
+        """, (SNAPSHOT_RETENSI, batas_harian, batas_harian))
+        old_ids = [(row[0],) for row in self.cursor.fetchall()]
+        self.cursor.executemany("DELETE FROM krs_snapshot_data WHERE snapshot_id=?", old_ids)
+        self.cursor.executemany("DELETE FROM krs_snapshot WHERE id=?", old_ids)
+        
+        if commit:
+            self.conn.commit()
+
+    def maybe_snapshot_krs(self):
+        """Buat snapshot jika sudah ada SNAPSHOT_SETIAP event sejak snapshot terakhir"""
+        self.cursor.execute("""
+            SELECT COALESCE((SELECT MAX(id) FROM krs_event), 0)
+                 - COALESCE((SELECT MAX(event_id) FROM krs_snapshot), 0)
+        """)
+        if self.cursor.fetchone()[0] >= SNAPSHOT_SETIAP:
+            self.buat_snapshot_krs()
+
+    def krs_per_tanggal(self, waktu, mahasiswa_id=None):
+        """State KRS pada waktu tertentu: snapshot terdekat + rentang event setelahnya
+        
+        Mengembalikan dict {(mahasiswa_id, mata_kuliah_id): status}.
+        """
+        self.cursor.execute("""
+            SELECT id, event_id FROM krs_snapshot
+            WHERE waktu <= ? ORDER BY event_id DESC LIMIT 1
+        """, (waktu,))
+        snapshot = self.cursor.fetchone()
+        if not snapshot:
+            # Sebelum riwayat mulai dicatat
+            return {}
+        
+        snapshot_id, event_id = snapshot
+        mhs_filter = " AND mahasiswa_id=?" if mahasiswa_id is not None else ""
+        mhs_param = (mahasiswa_id,) if mahasiswa_id is not None else ()
+        
+        self.cursor.execute(f"""
+            SELECT mahasiswa_id, mata_kuliah_id, status FROM krs_snapshot_data
+            WHERE snapshot_id=?{mhs_filter}
+        """, (snapshot_id,) + mhs_param)
+        state = {(mhs_id, mk_id): status for mhs_id, mk_id, status in self.cursor.fetchall()}
+        
+        self.cursor.execute(f"""
+            SELECT mahasiswa_id, mata_kuliah_id, aksi, status FROM krs_event
+            WHERE id > ? AND waktu <= ?{mhs_filter}
+            ORDER BY id
+        """, (event_id, waktu) + mhs_param)
+        for mhs_id, mk_id, aksi, status in self.cursor.fetchall():
+            if aksi == 'BATAL':
+                state.pop((mhs_id, mk_id), None)
+            else:
+                state[(mhs_id, mk_id)] = status
+        return state
+
+    def laporan_rows_per_tanggal(self, waktu, nim=None):
+        """Baris laporan (format sama dengan laporan_tree) dari state KRS per tanggal"""
+        mahasiswa_id = None
+        if nim is not None:
+            mahasiswa_id = self.mahasiswa_id_by_nim(nim)
+            if mahasiswa_id is None:
+                return []
+        
+        mahasiswa = {row[0]: row[1:] for row in self.cache.query("SELECT id, nim, nama FROM mahasiswa")}
+        matkul = {row[0]: row[1:] for row in self.cache.query("SELECT id, kode_mk, nama_mk, sks, dosen, jadwal FROM mata_kuliah")}
+        
+        rows = []
+        for (mhs_id, mk_id), status in self.krs_per_tanggal(waktu, mahasiswa_id).items():
+            if mhs_id in mahasiswa and mk_id in matkul:
+                rows.append(mahasiswa[mhs_id] + matkul[mk_id] + (status,))
+        rows.sort(key=lambda row: (row[0], row[2]))
+        return rows
+
+    def get_per_tanggal(self, peringatan=True):
+        """Baca filter per tanggal: None jika kosong, False jika format salah
+        
+        peringatan=False dipakai jalur timer (change feed) agar tidak memunculkan dialog berulang.
+        """
+        value = self.entry_per_tanggal.get().strip()
+        if not value:
+            return None
+        for fmt, suffix in (("%Y-%m-%d %H:%M:%S", ""), ("%Y-%m-%d", " 23:59:59")):
+            try:
+                datetime.strptime(value, fmt)
+                return value + suffix
+            except ValueError:
+                continue
+        if peringatan:
+            messagebox.showwarning("Format Tanggal! ⚠️", "Format tanggal harus YYYY-MM-DD atau YYYY-MM-DD HH:MM:SS!")
+        return False
 
     # Laporan functions
     def generate_laporan(self, event):
@@ -777,63 +1696,127 @@ class KRSAppFarhanAlfareza:
         
         nim = selection.split(' - ')[0]
         
+        per_tanggal = self.get_per_tanggal()
+        if per_tanggal is False:
+            return
+        self.laporan_semua = False
+        
         # Clear previous data
         for item in self.laporan_tree.get_children():
             self.laporan_tree.delete(item)
         
         # Get laporan data
-        self.cursor.execute("""
-            SELECT m.nim, m.nama, mk.kode_mk, mk.nama_mk, mk.sks, mk.dosen, mk.jadwal, k.status
-            FROM krs k
-            JOIN mahasiswa m ON k.mahasiswa_id = m.id
-            JOIN mata_kuliah mk ON k.mata_kuliah_id = mk.id
-            WHERE m.nim = ?
-            ORDER BY mk.kode_mk
-        """, (nim,))
+        if per_tanggal:
+            laporan_rows = self.laporan_rows_per_tanggal(per_tanggal, nim)
+        else:
+            laporan_rows = self.cache.query("""
+                SELECT m.nim, m.nama, mk.kode_mk, mk.nama_mk, mk.sks, mk.dosen, mk.jadwal, k.status
+                FROM krs k
+                JOIN mahasiswa m ON k.mahasiswa_id = m.id
+                JOIN mata_kuliah mk ON k.mata_kuliah_id = mk.id
+                WHERE m.nim = ?
+                ORDER BY mk.kode_mk
+            """, (nim,))
         
         total_sks = 0
         total_matkul = 0
         
-        for row in self.cursor.fetchall():
+        for row in laporan_rows:
             self.laporan_tree.insert('', 'end', values=row)
             total_sks += row[4]
             total_matkul += 1
         
         # Update statistics
-        self.cursor.execute("SELECT nama, max_sks FROM mahasiswa WHERE nim=?", (nim,))
-        mhs_data = self.cursor.fetchone()
-        if mhs_data:
-            nama, max_sks = mhs_data
+        mhs_rows = self.cache.query("SELECT nama, max_sks FROM mahasiswa WHERE nim=?", (nim,))
+        if mhs_rows:
+            nama, max_sks = mhs_rows[0]
             sisa_sks = max_sks - total_sks
             stats_text = f"📊 {nama} | Total Mata Kuliah: {total_matkul} | Total SKS: {total_sks}/{max_sks} | Sisa SKS: {sisa_sks}"
             self.stats_label.config(text=stats_text, fg='#27ae60' if sisa_sks >= 0 else '#e74c3c')
 
     def lihat_semua_laporan(self):
         """Lihat laporan semua mahasiswa"""
+        per_tanggal = self.get_per_tanggal()
+        if per_tanggal is False:
+            return
+        self.laporan_semua = True
+        
         # Clear previous data
         for item in self.laporan_tree.get_children():
             self.laporan_tree.delete(item)
         
         # Get all laporan data
-        self.cursor.execute("""
-            SELECT m.nim, m.nama, mk.kode_mk, mk.nama_mk, mk.sks, mk.dosen, mk.jadwal, k.status
-            FROM krs k
-            JOIN mahasiswa m ON k.mahasiswa_id = m.id
-            JOIN mata_kuliah mk ON k.mata_kuliah_id = mk.id
-            ORDER BY m.nim, mk.kode_mk
-        """)
+        if per_tanggal:
+            laporan_rows = self.laporan_rows_per_tanggal(per_tanggal)
+        else:
+            laporan_rows = self.cache.query("""
+                SELECT m.nim, m.nama, mk.kode_mk, mk.nama_mk, mk.sks, mk.dosen, mk.jadwal, k.status
+                FROM krs k
+                JOIN mahasiswa m ON k.mahasiswa_id = m.id
+                JOIN mata_kuliah mk ON k.mata_kuliah_id = mk.id
+                ORDER BY m.nim, mk.kode_mk
+            """)
         
         total_records = 0
-        for row in self.cursor.fetchall():
+        for row in laporan_rows:
             self.laporan_tree.insert('', 'end', values=row)
             total_records += 1
         
         # Update statistics
-        self.cursor.execute("SELECT COUNT(*) FROM mahasiswa")
-        total_mhs = self.cursor.fetchone()[0]
+        total_mhs = self.cache.query("SELECT COUNT(*) FROM mahasiswa")[0][0]
         
-        stats_text = f"📊 Total Mahasiswa: {total_mhs} | Total Record KRS: {total_records}"
+        stats_text = f"📊 Total Mahasiswa: {total_mhs} | Total Record KRS: {total_records} | {self.cache.info_text()} | {self.write_queue.info_text()}"
         self.stats_label.config(text=stats_text, fg='#2c3e50')
+        
+        if not per_tanggal:
+            self.mulai_statistik_paralel(stats_text)
+
+    def mulai_statistik_paralel(self, stats_text):
+        """Hitung statistik per jurusan di process pool, hasil digabung tanpa memblokir UI"""
+        self.write_queue.flush()
+        if self.in_memory:
+            # Worker membaca file disk, jadi tunggu salinan disk terbaru selesai dipersist
+            self.mulai_persist(lambda: self.submit_statistik_paralel(stats_text))
+        else:
+            self.submit_statistik_paralel(stats_text)
+
+    def submit_statistik_paralel(self, stats_text):
+        """Kirim satu task per jurusan ke process pool"""
+        jurusan_list = [row[0] for row in self.cache.query("SELECT DISTINCT jurusan FROM mahasiswa")]
+        if not jurusan_list:
+            return
+        
+        if self.report_executor is None:
+            # spawn: jangan fork proses Tk yang mungkin sedang menjalankan thread backup
+            self.report_executor = ProcessPoolExecutor(max_workers=os.cpu_count(),
+                                                       mp_context=multiprocessing.get_context('spawn'))
+        
+        self.report_job += 1
+        futures = [self.report_executor.submit(hitung_statistik_jurusan, self.db_path, jurusan)
+                   for jurusan in jurusan_list]
+        self.tunggu_statistik_paralel(self.report_job, futures, stats_text)
+
+    def tunggu_statistik_paralel(self, job, futures, stats_text):
+        """Poll future worker dengan root.after, lalu tampilkan statistik gabungan"""
+        if job != self.report_job:
+            # Sudah ada permintaan laporan yang lebih baru
+            return
+        if not all(future.done() for future in futures):
+            self.root.after(50, self.tunggu_statistik_paralel, job, futures, stats_text)
+            return
+        
+        try:
+            total = gabung_statistik(future.result() for future in futures)
+        except Exception as e:
+            self.stats_label.config(text=f"{stats_text}\n⚠️ Statistik gagal dihitung: {str(e)}", fg='#e74c3c')
+            return
+        
+        self.stats_label.config(text=(
+            f"{stats_text}\n"
+            f"📈 Total SKS: {total['total_sks']} | Total Mata Kuliah Diambil: {total['total_matkul']} | "
+            f"Melebihi Batas SKS: {total['melebihi']} | Di Bawah Batas SKS: {total['kurang']} | "
+            f"{len(futures)} partisi jurusan"
+        ), fg='#2c3e50')
 
     def cetak_krs(self):
         """Placeholder untuk cetak KRS"""
@@ -843,6 +1826,153 @@ class KRSAppFarhanAlfareza:
         
         messagebox.showinfo("Cetak KRS 🖨️", "Fitur cetak akan diintegrasikan dengan printer sistem!\n\nData KRS siap untuk dicetak.")
 
+    # Roster dosen functions
+    def on_tab_changed(self, event):
+        """Refresh jumlah peserta dan halaman peserta roster saat tab roster dibuka"""
+        if self.notebook.select() == str(self.roster_tab):
+            self.refresh_roster_matkul()
+            self.reload_roster_page()
+
+    def refresh_roster_matkul(self, event=None):
+        """Mata kuliah dosen terpilih: peserta aktif vs kapasitas, plus total semua status seperti di roster"""
+        dosen = self.dosen_combo.get()
+        selected = self.roster_matkul_tree.selection()
+        
+        for item in self.roster_matkul_tree.get_children():
+            self.roster_matkul_tree.delete(item)
+        if not dosen:
+            return
+        
+        rows = self.cache.query("""
+            SELECT mk.id, mk.kode_mk, mk.nama_mk, mk.jadwal, mk.ruang, mk.kapasitas,
+                   (SELECT COUNT(*) FROM krs k WHERE k.mata_kuliah_id = mk.id AND k.status = 'Aktif'),
+                   (SELECT COUNT(*) FROM krs k WHERE k.mata_kuliah_id = mk.id)
+            FROM mata_kuliah mk
+            WHERE mk.dosen = ?
+            ORDER BY mk.kode_mk
+        """, (dosen,))
+        for mk_id, kode_mk, nama_mk, jadwal, ruang, kapasitas, terisi, total in rows:
+            tags = ('penuh',) if terisi >= kapasitas else ()
+            self.roster_matkul_tree.insert('', 'end', iid=str(mk_id), tags=tags,
+                                           values=(kode_mk, nama_mk, jadwal, ruang, f"{terisi}/{kapasitas} ({total})"))
+        
+        if event is not None:
+            # Dosen baru dipilih: kosongkan roster
+            self.roster_mk_id = None
+            self.load_roster_page(None)
+        elif selected and self.roster_matkul_tree.exists(selected[0]):
+            self.roster_matkul_tree.selection_set(selected[0])
+
+    def on_roster_matkul_selected(self, event):
+        """Mulai dari halaman pertama roster mata kuliah terpilih"""
+        selected = self.roster_matkul_tree.selection()
+        if not selected or int(selected[0]) == self.roster_mk_id:
+            return
+        self.roster_mk_id = int(selected[0])
+        self.roster_page_keys = []
+        self.load_roster_page(0)
+
+    def load_roster_page(self, after_id):
+        """Muat satu halaman roster dengan keyset pagination (mahasiswa_id > after_id), bukan OFFSET
+        
+        Keyset pada k.mahasiswa_id mengikuti index (mata_kuliah_id, mahasiswa_id), jadi halaman
+        dibaca langsung dari index tanpa sort sementara. Semua status ditampilkan, sama dengan
+        angka total di daftar mata kuliah dan ekspor CSV.
+        """
+        for item in self.roster_tree.get_children():
+            self.roster_tree.delete(item)
+        if self.roster_mk_id is None or after_id is None:
+            self.roster_page_label.config(text="")
+            self.roster_page_keys = []
+            self.roster_next_key = None
+            return
+        
+        rows = self.cache.query("""
+            SELECT k.mahasiswa_id, m.nim, m.nama, m.jurusan, m.semester, k.tanggal_ambil, k.status
+            FROM krs k
+            JOIN mahasiswa m ON k.mahasiswa_id = m.id
+            WHERE k.mata_kuliah_id = ? AND k.mahasiswa_id > ?
+            ORDER BY k.mahasiswa_id
+            LIMIT ?
+        """, (self.roster_mk_id, after_id, ROSTER_PAGE_SIZE + 1))
+        
+        page_rows = rows[:ROSTER_PAGE_SIZE]
+        for row in page_rows:
+            self.roster_tree.insert('', 'end', values=row[1:])
+        
+        self.roster_page_keys.append(after_id)
+        self.roster_next_key = page_rows[-1][0] if len(rows) > ROSTER_PAGE_SIZE else None
+        self.roster_page_label.config(text=f"Halaman {len(self.roster_page_keys)}")
+
+    def reload_roster_page(self):
+        """Muat ulang halaman roster yang sedang tampil (posisi keyset tetap)"""
+        if self.roster_page_keys:
+            self.load_roster_page(self.roster_page_keys.pop())
+
+    def roster_halaman_berikutnya(self):
+        if self.roster_next_key is not None:
+            self.load_roster_page(self.roster_next_key)
+
+    def roster_halaman_sebelumnya(self):
+        if len(self.roster_page_keys) > 1:
+            self.roster_page_keys.pop()
+            self.load_roster_page(self.roster_page_keys.pop())
+
+    def ekspor_roster_dosen(self):
+        """Ekspor semua roster dosen terpilih ke CSV"""
+        dosen = self.dosen_combo.get()
+        if not dosen:
+            messagebox.showwarning("Pilih Dosen! ⚠️", "Pilih dosen terlebih dahulu!")
+            return
+        self.ekspor_roster(dosen)
+
+    def ekspor_semua_roster(self):
+        """Ekspor roster semua mata kuliah ke CSV"""
+        self.ekspor_roster(None)
+
+    def ekspor_roster(self, dosen):
+        """Tulis roster ke CSV dalam satu pass: baris di-stream dari cursor, tidak di-fetchall
+        
+        Urutan mengikuti index yang sudah ada (mata kuliah per (dosen, id) lewat
+        idx_mata_kuliah_dosen, peserta per mahasiswa_id lewat idx_krs_mata_kuliah_mahasiswa),
+        sehingga SQLite tidak perlu menyortir seluruh join KRS sebelum baris pertama ditulis.
+        """
+        nama_file = filedialog.asksaveasfilename(title="Simpan roster", defaultextension='.csv',
+                                                 filetypes=[("CSV", "*.csv")])
+        if not nama_file:
+            return
+        
+        sql = "SELECT id, dosen, kode_mk, nama_mk FROM mata_kuliah"
+        if dosen is not None:
+            matkul_rows = self.conn.execute(sql + " WHERE dosen = ? ORDER BY dosen, id", (dosen,))
+        else:
+            matkul_rows = self.conn.execute(sql + " ORDER BY dosen, id")
+        
+        try:
+            total = 0
+            with open(nama_file, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerow(['Dosen', 'Kode MK', 'Nama MK', 'NIM', 'Nama', 'Jurusan', 'Semester', 'Tanggal Ambil', 'Status'])
+                for mk_id, mk_dosen, kode_mk, nama_mk in matkul_rows:
+                    peserta_rows = self.conn.execute("""
+                        SELECT m.nim, m.nama, m.jurusan, m.semester, k.tanggal_ambil, k.status
+                        FROM krs k
+                        JOIN mahasiswa m ON k.mahasiswa_id = m.id
+                        WHERE k.mata_kuliah_id = ?
+                        ORDER BY k.mahasiswa_id
+                    """, (mk_id,))
+                    try:
+                        for row in peserta_rows:
+                            writer.writerow((mk_dosen, kode_mk, nama_mk) + row)
+                            total += 1
+                    finally:
+                        peserta_rows.close()
+            messagebox.showinfo("Sukses! 🎉", f"{total} baris roster diekspor ke {nama_file}")
+        except Exception as e:
+            messagebox.showerror("Error! ❌", f"Ekspor gagal: {str(e)}")
+        finally:
+            matkul_rows.close()
+
     # Data refresh functions
     def refresh_mahasiswa(self):
         """Refresh data mahasiswa"""
@@ -853,9 +1983,12 @@ class KRSAppFarhanAlfareza:
         # Load data
         self.cursor.execute("SELECT id, nim, nama, jurusan, semester, max_sks FROM mahasiswa ORDER BY nim")
         for row in self.cursor.fetchall():
-            self.mahasiswa_tree.insert('', 'end', values=row)
+            self.mahasiswa_tree.insert('', 'end', iid=str(row[0]), values=row)
         
-        # Update comboboxes
+        self.refresh_mahasiswa_combo()
+
+    def refresh_mahasiswa_combo(self):
+        """Update pilihan mahasiswa di combobox KRS dan laporan"""
         self.cursor.execute("SELECT nim, nama FROM mahasiswa ORDER BY nim")
         mahasiswa_list = [f"{nim} - {nama}" for nim, nama in self.cursor.fetchall()]
         
@@ -869,26 +2002,452 @@ class KRSAppFarhanAlfareza:
             self.matkul_tree.delete(item)
         
         # Load data
-        self.cursor.execute("""
-            SELECT kode_mk, nama_mk, sks, semester, jadwal, dosen, ruang, kapasitas 
+        matkul_rows = self.cache.query("""
+            SELECT id, kode_mk, nama_mk, sks, semester, jadwal, dosen, ruang, kapasitas 
             FROM mata_kuliah ORDER BY kode_mk
         """)
-        for row in self.cursor.fetchall():
-            self.matkul_tree.insert('', 'end', values=row)
+        for row in matkul_rows:
+            self.matkul_tree.insert('', 'end', iid=str(row[0]), values=row[1:])
+        
+        self.refresh_dosen_combo()
+
+    def refresh_dosen_combo(self):
+        """Update pilihan dosen di tab roster"""
+        self.dosen_combo['values'] = [row[0] for row in self.cache.query("SELECT DISTINCT dosen FROM mata_kuliah ORDER BY dosen")]
 
     def refresh_all_data(self):
         """Refresh semua data"""
         self.refresh_mahasiswa()
         self.refresh_matkul()
 
+    # Change feed functions
+    def start_change_feed(self):
+        """Inisialisasi posisi change feed lalu mulai polling dengan root.after"""
+        self.cursor.execute("SELECT MAX(seq) FROM perubahan_data")
+        self.last_change_seq = self.cursor.fetchone()[0] or 0
+        
+        self.prune_perubahan()
+        self.last_data_version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        self.root.after(CHANGE_LOG_PRUNE_INTERVAL_MS, self.scheduled_prune_perubahan)
+        if not self.in_memory:
+            # Database :memory: tidak bisa ditulis instance lain
+            self.root.after(POLL_INTERVAL_MS, self.poll_perubahan)
+
+    def prune_perubahan(self):
+        """Buang log lama, sisakan CHANGE_LOG_RETENSI baris terakhir
+        
+        Instance yang tertinggal melewati batas ini otomatis reload penuh
+        (lihat apply_perubahan), jadi pemangkasan tidak pernah menghilangkan perubahan.
+        """
+        self.cursor.execute("SELECT MIN(seq), MAX(seq) FROM perubahan_data")
+        min_seq, max_seq = self.cursor.fetchone()
+        if min_seq is None or min_seq > max_seq - CHANGE_LOG_RETENSI:
+            return
+        
+        self.write_queue.submit(lambda: self.cursor.execute(
+            "DELETE FROM perubahan_data WHERE seq <= ?", (max_seq - CHANGE_LOG_RETENSI,)))
+
+    def scheduled_prune_perubahan(self):
+        """Pemangkasan berkala supaya log tidak tumbuh tanpa batas pada instance yang lama berjalan"""
+        try:
+            self.prune_perubahan()
+        except sqlite3.Error:
+            pass
+        self.root.after(CHANGE_LOG_PRUNE_INTERVAL_MS, self.scheduled_prune_perubahan)
+
+    def poll_perubahan(self):
+        """Cek data_version (murah); baca change feed hanya jika ada tulis dari koneksi lain"""
+        try:
+            data_version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+            if data_version != self.last_data_version:
+                self.last_data_version = data_version
+                self.apply_perubahan()
+        except sqlite3.Error:
+            pass
+        self.root.after(POLL_INTERVAL_MS, self.poll_perubahan)
+
+    def apply_perubahan(self):
+        """Terapkan hanya baris yang berubah sejak seq terakhir yang sudah dilihat"""
+        self.cursor.execute("SELECT MIN(seq) FROM perubahan_data")
+        min_seq = self.cursor.fetchone()[0]
+        self.cursor.execute("SELECT MAX(seq) FROM perubahan_data")
+        max_seq = self.cursor.fetchone()[0] or 0
+        if (min_seq is not None and min_seq > self.last_change_seq + 1) or max_seq < self.last_change_seq:
+            # Log sudah dipangkas melewati posisi kita, atau database di-restore: reload penuh
+            self.reload_penuh()
+            return
+        
+        self.cursor.execute("""
+            SELECT seq, tabel, row_id, mahasiswa_id FROM perubahan_data
+            WHERE seq > ? ORDER BY seq
+        """, (self.last_change_seq,))
+        changes = self.cursor.fetchall()
+        if not changes:
+            return
+        
+        self.last_change_seq = changes[-1][0]
+        mahasiswa_ids = {row_id for _, tabel, row_id, _ in changes if tabel == 'mahasiswa'}
+        matkul_ids = {row_id for _, tabel, row_id, _ in changes if tabel == 'mata_kuliah'}
+        krs_mahasiswa_ids = {mhs_id for _, tabel, _, mhs_id in changes if tabel == 'krs'}
+        
+        # Katalog berubah: bangun ulang engine; KRS berubah: perbarui bitset mahasiswa terkait
+        if matkul_ids:
+            self.eligibility = None
+        for mahasiswa_id in krs_mahasiswa_ids:
+            self.krs_mahasiswa_berubah(mahasiswa_id)
+        
+        for mahasiswa_id in mahasiswa_ids:
+            self.cursor.execute("SELECT id, nim, nama, jurusan, semester, max_sks FROM mahasiswa WHERE id=?", (mahasiswa_id,))
+            self.apply_tree_row(self.mahasiswa_tree, mahasiswa_id, self.cursor.fetchone(), sort_col=1)
+        if mahasiswa_ids:
+            self.refresh_mahasiswa_combo()
+        
+        for matkul_id in matkul_ids:
+            self.cursor.execute("""
+                SELECT kode_mk, nama_mk, sks, semester, jadwal, dosen, ruang, kapasitas
+                FROM mata_kuliah WHERE id=?
+            """, (matkul_id,))
+            self.apply_tree_row(self.matkul_tree, matkul_id, self.cursor.fetchone(), sort_col=0)
+        if matkul_ids:
+            self.refresh_dosen_combo()
+        
+        # Jumlah peserta roster ikut berubah jika ada KRS yang berubah
+        if matkul_ids or krs_mahasiswa_ids:
+            self.refresh_roster_matkul()
+            self.reload_roster_page()
+        
+        # KRS dan laporan hanya di-refresh jika mahasiswa yang sedang tampil ikut berubah
+        affected_ids = krs_mahasiswa_ids | mahasiswa_ids | {None}
+        if hasattr(self, 'current_nim') and (matkul_ids or self.mahasiswa_id_by_nim(self.current_nim) in affected_ids):
+            self.update_krs_info()
+            self.refresh_krs_data()
+        
+        # Laporan: tanggal tidak valid di field "Per Tanggal" -> lewati tanpa dialog
+        if self.get_per_tanggal(peringatan=False) is False:
+            return
+        if self.laporan_semua:
+            if matkul_ids or mahasiswa_ids or krs_mahasiswa_ids:
+                self.lihat_semua_laporan()
+            return
+        laporan_selection = self.laporan_combo.get()
+        if laporan_selection:
+            laporan_nim = laporan_selection.split(' - ')[0]
+            if matkul_ids or self.mahasiswa_id_by_nim(laporan_nim) in affected_ids:
+                self.generate_laporan(None)
+
+    def apply_tree_row(self, tree, row_id, values, sort_col):
+        """Insert, update, atau hapus satu baris treeview (iid = id database)"""
+        iid = str(row_id)
+        if values is None:
+            if tree.exists(iid):
+                tree.delete(iid)
+        elif tree.exists(iid):
+            tree.item(iid, values=values)
+        else:
+            # Sisipkan pada posisi urut agar sama dengan hasil reload penuh
+            index = 'end'
+            for position, child in enumerate(tree.get_children()):
+                if str(tree.item(child)['values'][sort_col]) > str(values[sort_col]):
+                    index = position
+                    break
+            tree.insert('', index, iid=iid, values=values)
+
+    def reload_penuh(self):
+        """Reload semua tampilan dan reset posisi change feed"""
+        self.cursor.execute("SELECT MAX(seq) FROM perubahan_data")
+        self.last_change_seq = self.cursor.fetchone()[0] or 0
+        self.eligibility = None
+        self.refresh_all_data()
+        self.update_krs_info()
+        self.refresh_krs_data()
+
+    def mahasiswa_id_by_nim(self, nim):
+        """Ambil id mahasiswa dari NIM (None jika tidak ada)"""
+        rows = self.cache.query("SELECT id FROM mahasiswa WHERE nim=?", (nim,))
+        return rows[0][0] if rows else None
+
+    # Integritas data functions
+    def cek_integritas(self, perbaiki=False, commit=True):
+        """Cari (dan opsional perbaiki) data yatim/duplikat dengan anti-join
+        
+        Setiap pemeriksaan adalah satu scan tabel dengan lookup index/primary key,
+        bukan perbandingan baris per baris di Python.
+        """
+        checks = {
+            'krs tanpa mahasiswa': ("krs", """
+                NOT EXISTS (SELECT 1 FROM mahasiswa m WHERE m.id = krs.mahasiswa_id)"""),
+            'krs tanpa mata kuliah': ("krs", """
+                NOT EXISTS (SELECT 1 FROM mata_kuliah mk WHERE mk.id = krs.mata_kuliah_id)"""),
+            'krs duplikat': ("krs", """
+                EXISTS (SELECT 1 FROM krs k2 WHERE k2.mahasiswa_id = krs.mahasiswa_id
+                        AND k2.mata_kuliah_id = krs.mata_kuliah_id AND k2.id < krs.id)"""),
+            'snapshot data yatim': ("krs_snapshot_data", """
+                NOT EXISTS (SELECT 1 FROM krs_snapshot s WHERE s.id = krs_snapshot_data.snapshot_id)"""),
+        }
+        
+        hasil = {}
+        for nama, (tabel, kondisi) in checks.items():
+            self.cursor.execute(f"SELECT COUNT(*) FROM {tabel} WHERE {kondisi}")
+            hasil[nama] = self.cursor.fetchone()[0]
+        
+        if perbaiki and any(hasil.values()):
+            waktu = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            for nama, (tabel, kondisi) in checks.items():
+                if not hasil[nama]:
+                    continue
+                if tabel == 'krs' and nama != 'krs duplikat':
+                    # Catat KRS yatim yang dibuang supaya riwayat tetap konsisten
+                    self.cursor.execute(f"""
+                        INSERT INTO krs_event (mahasiswa_id, mata_kuliah_id, aksi, status, waktu, operator)
+                        SELECT mahasiswa_id, mata_kuliah_id, 'BATAL', NULL, ?, ? FROM krs
+                        WHERE mahasiswa_id IS NOT NULL AND mata_kuliah_id IS NOT NULL AND {kondisi}
+                    """, (waktu, self.operator))
+                self.cursor.execute(f"DELETE FROM {tabel} WHERE {kondisi}")
+            if commit:
+                self.conn.commit()
+        return hasil
+
+    def cek_integritas_gui(self):
+        """Tampilkan hasil cek integritas dan tawarkan perbaikan"""
+        try:
+            self.write_queue.flush()
+            hasil = self.cek_integritas()
+            detail = "\n".join(f"• {nama}: {jumlah}" for nama, jumlah in hasil.items())
+            if not any(hasil.values()):
+                messagebox.showinfo("Cek Integritas 🩺", f"Data konsisten!\n\n{detail}")
+                return
+            
+            if messagebox.askyesno("Cek Integritas 🩺", f"Ditemukan data tidak konsisten:\n\n{detail}\n\nPerbaiki sekarang?"):
+                def on_done(ok, result):
+                    if ok:
+                        self.reload_penuh()
+                        messagebox.showinfo("Sukses! 🎉", "Data berhasil diperbaiki!")
+                    else:
+                        messagebox.showerror("Error! ❌", f"Terjadi kesalahan: {str(result)}")
+                
+                self.write_queue.submit(lambda: self.cek_integritas(perbaiki=True, commit=False), on_done)
+        except Exception as e:
+            messagebox.showerror("Error! ❌", f"Terjadi kesalahan: {str(e)}")
+
+    # Backup functions
+    def scheduled_backup(self):
+        """Backup terjadwal, dijadwalkan ulang setiap BACKUP_INTERVAL_MS"""
+        self.mulai_backup(manual=False)
+        self.root.after(BACKUP_INTERVAL_MS, self.scheduled_backup)
+
+    def backup_sekarang(self):
+        """Backup manual dari tombol header"""
+        if not self.mulai_backup(manual=True):
+            messagebox.showinfo("Backup 💾", "Backup sedang berjalan, tunggu sebentar!")
+
+    def mulai_backup(self, manual):
+        """Mulai backup online di thread terpisah dengan koneksi sumber sendiri
+        
+        sqlite3 backup API menyalin BACKUP_PAGES_PER_STEP halaman per langkah dan
+        melepas lock di antara langkah, sehingga penulis lain tetap jalan. Selama
+        backup, heartbeat root.after mengukur jeda UI terpanjang.
+        """
+        if self.backup_menunggu or (self.backup_thread is not None and self.backup_thread.is_alive()):
+            return False
+        
+        self.write_queue.flush()
+        if self.in_memory:
+            # Thread backup membaca file disk, bukan koneksi :memory:, jadi persist dulu
+            self.backup_menunggu = True
+            self.mulai_persist(lambda: self.mulai_thread_backup(manual))
+        else:
+            self.mulai_thread_backup(manual)
+        return True
+
+    def mulai_thread_backup(self, manual):
+        """Jalankan thread backup dan heartbeat pengukur jeda UI"""
+        self.backup_menunggu = False
+        os.makedirs(BACKUP_DIR, exist_ok=True)
+        nama_file = os.path.join(BACKUP_DIR, f"farhan_krs_{datetime.now().strftime('%Y%m%d_%H%M%S')}.db")
+        self.backup_result = None
+        self.backup_max_stall = 0.0
+        self.backup_thread = threading.Thread(target=self.jalankan_backup, args=(nama_file,), daemon=True)
+        self.backup_thread.start()
+        self.backup_heartbeat(time.perf_counter(), manual)
+
+    def jalankan_backup(self, nama_file):
+        """Isi thread backup: salin ke file sementara, rename atomik, lalu rotasi"""
+        start = time.perf_counter()
+        tmp_file = nama_file + '.tmp'
+        try:
+            source = sqlite3.connect(self.db_path)
+            target = sqlite3.connect(tmp_file)
+            try:
+                source.backup(target, pages=BACKUP_PAGES_PER_STEP, sleep=0.001)
+            finally:
+                target.close()
+                source.close()
+            os.replace(tmp_file, nama_file)
+            self.rotasi_backup()
+            self.backup_result = (True, nama_file, time.perf_counter() - start)
+        except Exception as e:
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
+            self.backup_result = (False, e, time.perf_counter() - start)
+
+    def backup_heartbeat(self, expected, manual, interval_ms=20):
+        """Ukur keterlambatan event loop selama backup berjalan"""
+        now = time.perf_counter()
+        self.backup_max_stall = max(self.backup_max_stall, now - expected)
+        if self.backup_thread.is_alive():
+            self.root.after(interval_ms, self.backup_heartbeat, now + interval_ms / 1000, manual)
+            return
+        
+        ok, value, durasi = self.backup_result
+        if ok:
+            info = f"💾 Backup terakhir: {datetime.now().strftime('%H:%M:%S')} | {durasi * 1000:.0f} ms | jeda UI maks {self.backup_max_stall * 1000:.0f} ms"
+            self.backup_label.config(text=info)
+            if manual:
+                messagebox.showinfo("Backup Sukses! 🎉", f"Backup tersimpan di {value}\n\n{info}")
+        else:
+            self.backup_label.config(text="💾 Backup gagal!")
+            if manual:
+                messagebox.showerror("Error! ❌", f"Backup gagal: {str(value)}")
+
+    @staticmethod
+    def rotasi_backup():
+        """Hapus snapshot backup tertua, sisakan BACKUP_RETENSI file terbaru"""
+        files = sorted(f for f in os.listdir(BACKUP_DIR) if f.startswith('farhan_krs_') and f.endswith('.db'))
+        for nama in files[:-BACKUP_RETENSI]:
+            os.remove(os.path.join(BACKUP_DIR, nama))
+
+    def restore_backup(self):
+        """Restore database dari snapshot backup langsung ke koneksi yang sedang berjalan"""
+        nama_file = filedialog.askopenfilename(title="Pilih file backup", initialdir=BACKUP_DIR,
+                                               filetypes=[("SQLite database", "*.db")])
+        if not nama_file:
+            return
+        
+        if not messagebox.askyesno("Konfirmasi Restore! ♻️", f"Yakin restore dari {os.path.basename(nama_file)}?\nSemua perubahan setelah backup ini akan hilang!"):
+            return
+        
+        if self.persist_thread is not None and self.persist_thread.is_alive():
+            messagebox.showinfo("Restore ♻️", "Database sedang dipersist ke disk, coba lagi sebentar!")
+            return
+        
+        try:
+            self.write_queue.flush()
+            source = sqlite3.connect(nama_file)
+            try:
+                source.backup(self.conn)
+            finally:
+                source.close()
+            
+            # backup() tidak menaikkan total_changes, jadi paksa persist berikutnya menulis ulang
+            self.persisted_changes = None
+            self.cache.clear()
+            self.reload_penuh()
+            messagebox.showinfo("Sukses! 🎉", "Database berhasil di-restore!")
+        except Exception as e:
+            messagebox.showerror("Error! ❌", f"Restore gagal: {str(e)}")
+
+    # Persistence functions (mode in-memory)
+    def scheduled_persist(self):
+        """Persist berkala, dijadwalkan ulang setiap PERSIST_INTERVAL_MS"""
+        self.mulai_persist()
+        self.root.after(PERSIST_INTERVAL_MS, self.scheduled_persist)
+
+    def mulai_persist(self, callback=None):
+        """Persist :memory: ke disk di thread terpisah tanpa membekukan UI
+        
+        Antrian tulis ditahan selama penyalinan supaya snapshot konsisten; baca tetap
+        jalan. callback dipanggil di thread UI setelah salinan disk selesai.
+        """
+        if callback:
+            self.persist_callbacks.append(callback)
+        if self.persist_thread is not None and self.persist_thread.is_alive():
+            return
+        
+        self.write_queue.flush()
+        if self.persisted_changes == self.conn.total_changes:
+            self.selesai_persist()
+            return
+        
+        self.write_queue.paused = True
+        self.persist_result = None
+        self.persist_thread = threading.Thread(target=self.jalankan_persist, daemon=True)
+        self.persist_thread.start()
+        self.tunggu_persist(self.conn.total_changes)
+
+    def jalankan_persist(self):
+        """Isi thread persist: salin bertahap ke file sementara lalu rename atomik"""
+        tmp_file = self.db_path + '.tmp'
+        try:
+            target = sqlite3.connect(tmp_file)
+            try:
+                self.conn.backup(target, pages=BACKUP_PAGES_PER_STEP, sleep=0.001)
+            finally:
+                target.close()
+            os.replace(tmp_file, self.db_path)
+        except Exception as e:
+            self.persist_result = e
+
+    def tunggu_persist(self, changes):
+        """Poll thread persist dengan root.after, lalu lanjutkan antrian tulis"""
+        if self.persist_thread.is_alive():
+            self.root.after(20, self.tunggu_persist, changes)
+            return
+        
+        self.write_queue.paused = False
+        if self.persist_result is None:
+            self.persisted_changes = changes
+        else:
+            self.backup_label.config(text=f"⚠️ Persist gagal: {str(self.persist_result)}")
+        self.selesai_persist()
+        self.write_queue.flush()
+
+    def selesai_persist(self):
+        """Jalankan callback yang menunggu salinan disk terbaru"""
+        callbacks, self.persist_callbacks = self.persist_callbacks, []
+        for callback in callbacks:
+            callback()
+
+    def persist_ke_disk(self):
+        """Persist sinkron saat aplikasi ditutup (boleh memblokir, UI sudah tidak dipakai)"""
+        if self.persist_thread is not None:
+            self.persist_thread.join()
+        self.write_queue.paused = False
+        self.write_queue.flush()
+        if self.persisted_changes == self.conn.total_changes:
+            return
+        
+        tmp_file = self.db_path + '.tmp'
+        target = sqlite3.connect(tmp_file)
+        try:
+            self.conn.backup(target)
+        finally:
+            target.close()
+        os.replace(tmp_file, self.db_path)
+        self.persisted_changes = self.conn.total_changes
+
+    def on_close(self):
+        """Commit antrian tulis yang tersisa sebelum aplikasi ditutup"""
+        self.write_queue.flush()
+        if self.in_memory:
+            self.persist_ke_disk()
+        if self.report_executor is not None:
+            self.report_executor.shutdown(wait=False, cancel_futures=True)
+        self.root.destroy()
+
     def __del__(self):
         """Destructor untuk menutup koneksi database"""
         if hasattr(self, 'conn'):
             self.conn.close()
 
 def main():
+    parser = argparse.ArgumentParser(description="Sistem KRS Digital - Farhan Alfareza")
+    parser.add_argument('--db', help=f"lokasi file database (default: {DB_PATH})")
+    parser.add_argument('--memory', action='store_true', default=None,
+                        help=f"layani semua baca/tulis dari :memory:, persist ke disk setiap {PERSIST_INTERVAL_MS} ms dan saat keluar")
+    args = parser.parse_args()
+    
     root = tk.Tk()
-    app = KRSAppFarhanAlfareza(root)
+    app = KRSAppFarhanAlfareza(root, db_path=args.db, in_memory=args.memory)
     root.mainloop()
 
 if __name__ == "__main__":